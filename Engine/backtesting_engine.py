@@ -1,37 +1,162 @@
+from time import perf_counter
+
+
+def process_candle(candle, price, strategy, execution, portfolio, metrics):
+    # One bar for one strategy: signal -> execution -> portfolio -> equity
+    signal = strategy.on_candle(candle)
+
+    # Execute order if signal
+    if signal in ("BUY", "SELL"):
+        executed_price = execution.execute(signal, price)
+        sl_price = getattr(strategy, 'get_sl_price', lambda: None)()
+        status = portfolio.update(signal, executed_price, sl_price=sl_price)
+    else:
+        # VERY IMPORTANT:
+        # still check stop loss / take profit
+        status = portfolio.update(None, price)
+
+    # SYNC Strategy position if portfolio closed it (SL)
+    if status == "CLOSED" and strategy.position == 1:
+        # Use duck typing or check if method exists
+        if hasattr(strategy, 'sync_position'):
+            strategy.sync_position(0)
+        else:
+            strategy.position = 0
+
+    # Clean equity calculation
+    equity = portfolio.get_equity(price)
+    metrics.update_equity(equity, portfolio.position == 1)
+
+
+def process_candle_timed(candle, price, strategy, execution, portfolio, metrics, timer):
+    # Same steps as process_candle, each one timed into a StageTimer
+    clock = perf_counter
+
+    t0 = clock()
+    signal = strategy.on_candle(candle)
+    t1 = clock()
+    timer.add("strategy.on_candle", t1 - t0)
+
+    if signal in ("BUY", "SELL"):
+        executed_price = execution.execute(signal, price)
+        t2 = clock()
+        timer.add("execution.execute", t2 - t1)
+        sl_price = getattr(strategy, 'get_sl_price', lambda: None)()
+        status = portfolio.update(signal, executed_price, sl_price=sl_price)
+    else:
+        t2 = t1
+        status = portfolio.update(None, price)
+    t3 = clock()
+    timer.add("portfolio.update", t3 - t2)
+
+    if status == "CLOSED" and strategy.position == 1:
+        if hasattr(strategy, 'sync_position'):
+            strategy.sync_position(0)
+        else:
+            strategy.position = 0
+
+    t4 = clock()
+    equity = portfolio.get_equity(price)
+    t5 = clock()
+    timer.add("portfolio.get_equity", t5 - t4)
+    metrics.update_equity(equity, portfolio.position == 1)
+    timer.add("metrics.update_equity", clock() - t5)
+
+
 class BacktestingEngine:
-    def __init__(self, datafeed, execution, strategy, portfolio, metrics):
+    def __init__(self, datafeed, execution, strategy, portfolio, metrics, timer=None, stop=None):
         self.datafeed = datafeed
         self.strategy = strategy
         self.execution = execution
         self.portfolio = portfolio
         self.metrics = metrics
+        self.timer = timer  # optional StageTimer, None keeps the plain loop
+        self.stop = stop  # optional StopRules, checked after every candle
 
     def run(self):
+        if self.timer is not None:
+            return self._run_timed()
 
+        stop = self.stop
         while self.datafeed.has_next():
 
             candle = self.datafeed.next_candle()
-            signal = self.strategy.on_candle(candle)
             price = candle["close"]
+            process_candle(candle, price, self.strategy, self.execution, self.portfolio, self.metrics)
 
-            # Execute order if signal
-            if signal in ("BUY", "SELL"):
-                executed_price = self.execution.execute(signal, price)
-                sl_price = getattr(self.strategy, 'get_sl_price', lambda: None)()
-                status = self.portfolio.update(signal, executed_price, sl_price=sl_price)
+            if stop is not None:
+                reason = stop.check(self.metrics)
+                if reason:
+                    self.metrics.terminate(reason)
+                    break
+
+    def _run_timed(self):
+        timer = self.timer
+        stop = self.stop
+        while self.datafeed.has_next():
+            t0 = perf_counter()
+            candle = self.datafeed.next_candle()
+            price = candle["close"]
+            timer.add("datafeed.next_candle", perf_counter() - t0)
+            process_candle_timed(candle, price, self.strategy, self.execution, self.portfolio, self.metrics, timer)
+
+            if stop is not None:
+                reason = stop.check(self.metrics)
+                if reason:
+                    self.metrics.terminate(reason)
+                    break
+
+
+class MultiBacktestingEngine:
+    """
+    Runs several independent (strategy, execution, portfolio, metrics) tuples in a
+    single pass over the DataFeed: every candle is pulled and its close extracted
+    once, then fanned out to all of them. With stop rules a terminated run drops
+    out of the fan-out and the pass ends when none are left.
+    """
+    def __init__(self, datafeed, runs, timer=None, stop=None):
+        self.datafeed = datafeed
+        self.runs = list(runs)
+        self.timer = timer
+        self.stop = stop
+
+    def _prune(self, runs):
+        alive = []
+        for run in runs:
+            metrics = run[3]
+            reason = self.stop.check(metrics)
+            if reason:
+                metrics.terminate(reason)
             else:
-                # VERY IMPORTANT:
-                # still check stop loss / take profit
-                status = self.portfolio.update(None, price)
-
-            # SYNC Strategy position if portfolio closed it (SL)
-            if status == "CLOSED" and self.strategy.position == 1:
-                # Use duck typing or check if method exists
-                if hasattr(self.strategy, 'sync_position'):
-                    self.strategy.sync_position(0)
-                else:
-                    self.strategy.position = 0
-
-            # Clean equity calculation
-            equity = self.portfolio.get_equity(price)
-            self.metrics.update_equity(equity)
\ No newline at end of file
+                alive.append(run)
+        return alive
+
+    def run(self):
+        runs = self.runs
+        if self.timer is not None:
+            return self._run_timed()
+
+        stop = self.stop
+        while runs and self.datafeed.has_next():
+
+            candle = self.datafeed.next_candle()
+            price = candle["close"]
+            for strategy, execution, portfolio, metrics in runs:
+                process_candle(candle, price, strategy, execution, portfolio, metrics)
+
+            if stop is not None:
+                runs = self._prune(runs)
+
+    def _run_timed(self):
+        timer = self.timer
+        runs = self.runs
+        while runs and self.datafeed.has_next():
+            t0 = perf_counter()
+            candle = self.datafeed.next_candle()
+            price = candle["close"]
+            timer.add("datafeed.next_candle", perf_counter() - t0)
+            for strategy, execution, portfolio, metrics in runs:
+                process_candle_timed(candle, price, strategy, execution, portfolio, metrics, timer)
+
+            if self.stop is not None:
+                runs = self._prune(runs)
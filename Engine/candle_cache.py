@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from Engine.data_loader import DataLoader
+from Engine.datafeed import to_columns
+
+DEFAULT_CANDLE_DIR = "cache/candles"
+FORMAT_VERSION = 1
+
+
+class CandleCache:
+    """
+    Local binary copy of a dataset: one raw .npy file per column (as datafeed.to_columns
+    builds them) plus meta.json. The first load of a source (+ filters) decodes the
+    Parquet/CSV once and writes the entry; later loads memory-map the .npy files, so
+    opening is near instant and every process reading the same candles shares the
+    same page cache pages instead of holding its own copy.
+    An entry is used while the source stamp (size + mtime of every file) is unchanged.
+    """
+    def __init__(self, path=DEFAULT_CANDLE_DIR):
+        self.path = Path(path)
+
+    def entry(self, source, filters):
+        key = json.dumps({"source": str(Path(source).resolve()), "filters": filters}, sort_keys=True, default=str)
+        return self.path / hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def load(self, source, **filters):
+        """{column: read-only array} for source, built on the first call."""
+        entry = self.entry(source, filters)
+        stamp = source_stamp(source)
+        columns = self._open(entry, stamp)
+        if columns is None:
+            columns = to_columns(DataLoader().load_data(source, **filters))
+            try:
+                self._write(entry, source, filters, stamp, columns)
+            except OSError:
+                return columns  # read only location and so on, the decoded columns still work
+            columns = self._open(entry, stamp) or columns
+        return columns
+
+    def _open(self, entry, stamp):
+        try:
+            meta = json.loads((entry / "meta.json").read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if meta.get("version") != FORMAT_VERSION or meta.get("stamp") != stamp:
+            return None
+        try:
+            # np.asarray drops the memmap subclass, plain ndarray indexing stays fast in the candle loop
+            return {name: np.asarray(np.load(entry / f"{i}.npy", mmap_mode="r"))
+                    for i, name in enumerate(meta["columns"])}
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write(self, entry, source, filters, stamp, columns):
+        # written next to the entry and renamed in, readers never see half an entry
+        tmp = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for i, values in enumerate(columns.values()):
+            np.save(tmp / f"{i}.npy", values)  # file names by position, column names may not be path safe
+        meta = {
+            "version": FORMAT_VERSION,
+            "source": str(source),
+            "filters": filters,
+            "stamp": stamp,
+            "columns": list(columns),
+            "length": len(next(iter(columns.values()))) if columns else 0,
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta, default=str))
+        shutil.rmtree(entry, ignore_errors=True)  # stale entry, open memmaps of it stay valid
+        try:
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)  # another process renamed its copy in first
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def source_stamp(source):
+    # cheap fingerprint: relative path, size and mtime of every file of the source
+    root = Path(source)
+    files = sorted(p for p in root.rglob("*") if p.is_file()) if root.is_dir() else [root]
+    stamp = []
+    for file in files:
+        stat = file.stat()
+        name = file.relative_to(root).as_posix() if root.is_dir() else file.name
+        stamp.append([name, stat.st_size, stat.st_mtime_ns])
+    return stamp
+
+
+def load_candles(source, cache_dir=None, **filters):
+    # columns of a dataset, through the candle cache when a cache directory is given
+    if not cache_dir:
+        return to_columns(DataLoader().load_data(source, **filters))
+    return CandleCache(cache_dir).load(source, **filters)
@@ -1,10 +1,189 @@
+from pathlib import Path
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+OHLCV = ["open", "high", "low", "close", "volume"]
+TIME_COLUMNS = ("open_time", "timestamp")  # whichever the dataset has
+TIME_DTYPE = "datetime64[ns, UTC]"  # every source's times come back as this
+FILTER_KEYS = ("start", "end", "symbols", "columns")
+
 
 class DataLoader:
-    def load_data(self, path):
-        if path.endswith(".parquet"):
-            return pd.read_parquet(path)
-        elif path.endswith(".csv"):
-            return pd.read_csv(path)
+    """
+    Loads a .parquet file, a (hive partitioned, e.g. year=2021/) Parquet directory or a .csv.
+    start/end (end exclusive), symbols and columns are pushed down for Parquet:
+    pyarrow.dataset prunes partitions and skips row groups by their min/max
+    statistics, and only the projected columns are read. By default that is the
+    time column + OHLCV, numeric columns come back as float64 / int64.
+    """
+    def load_data(self, path, start=None, end=None, symbols=None, columns=None):
+        path = str(path)
+        if path.endswith(".csv"):
+            return self._load_csv(path, start, end, symbols, columns)
+        if path.endswith(".parquet") or Path(path).is_dir():
+            return self._load_parquet(path, start, end, symbols, columns)
+        raise ValueError("Unsupported file format")
+
+    def iter_batches(self, path, batch_size=100_000, start=None, end=None, symbols=None, columns=None):
+        """
+        Same reads as load_data, a DataFrame of at most batch_size rows at a time
+        (Parquet record batches / CSV chunks), so memory follows the batch, not the file.
+        Rows come in file order, a partitioned dataset in partition order.
+        """
+        path = str(path)
+        if path.endswith(".csv"):
+            time_col, wanted, extra = _csv_columns(path, start, end, symbols, columns)
+            for chunk in pd.read_csv(path, usecols=wanted + extra, chunksize=batch_size):
+                yield _finish(_filter_frame(chunk, time_col, start, end, symbols, extra), time_col, sort=False)
+        elif path.endswith(".parquet") or Path(path).is_dir():
+            dataset, time_col, projection, condition = _parquet_scan(path, start, end, symbols, columns)
+            for batch in dataset.to_batches(columns=projection, filter=condition, batch_size=batch_size):
+                if batch.num_rows:
+                    yield _finish(batch.to_pandas(), time_col, sort=False)
         else:
             raise ValueError("Unsupported file format")
+
+    def count_rows(self, path, start=None, end=None, symbols=None):
+        # bar count without materialising the candles (Parquet: footers, plus the filter columns if filtered)
+        path = str(path)
+        if path.endswith(".csv"):
+            return sum(len(chunk) for chunk in self.iter_batches(path, start=start, end=end, symbols=symbols))
+        if path.endswith(".parquet") or Path(path).is_dir():
+            dataset, _, _, condition = _parquet_scan(path, start, end, symbols, None)
+            return dataset.count_rows(filter=condition)
+        raise ValueError("Unsupported file format")
+
+    def _load_parquet(self, path, start, end, symbols, columns):
+        dataset, time_col, projection, condition = _parquet_scan(path, start, end, symbols, columns)
+        table = dataset.to_table(columns=projection, filter=condition)
+        return _finish(table.to_pandas(), time_col)
+
+    def _load_csv(self, path, start, end, symbols, columns):
+        # no pushdown for CSV, only the projection is applied while parsing
+        time_col, wanted, extra = _csv_columns(path, start, end, symbols, columns)
+        df = pd.read_csv(path, usecols=wanted + extra)
+        return _finish(_filter_frame(df, time_col, start, end, symbols, extra), time_col)
+
+
+def _parquet_scan(path, start, end, symbols, columns):
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    names = dataset.schema.names
+    time_col = next((c for c in TIME_COLUMNS if c in names), None)
+
+    condition = None
+
+    def add(expr):
+        nonlocal condition
+        condition = expr if condition is None else condition & expr
+
+    if time_col is not None and (start is not None or end is not None):
+        time_type = dataset.schema.field(time_col).type
+        if start is not None:
+            add(ds.field(time_col) >= _scalar(start, time_type))
+        if end is not None:
+            add(ds.field(time_col) < _scalar(end, time_type))
+        if "year" in names:  # partition key written by Scripts/csv_to_partitioned_parquet.py
+            # partition years are UTC years, like the time filter above
+            if start is not None:
+                add(ds.field("year") >= _utc(start).year)
+            if end is not None:
+                add(ds.field("year") <= _utc(end).year)
+    if symbols is not None and "symbol" in names:
+        add(ds.field("symbol").isin(list(symbols)))
+    return dataset, time_col, _projection(names, time_col, columns), condition
+
+
+def _csv_columns(path, start, end, symbols, columns):
+    header = pd.read_csv(path, nrows=0).columns
+    time_col = next((c for c in TIME_COLUMNS if c in header), None)
+    wanted = _projection(list(header), time_col, columns)
+    extra = []  # filter columns that are not part of the projection
+    if time_col is not None and (start is not None or end is not None) and time_col not in wanted:
+        extra.append(time_col)
+    if symbols is not None and "symbol" in header and "symbol" not in wanted:
+        extra.append("symbol")
+    return time_col, wanted, extra
+
+
+def _filter_frame(df, time_col, start, end, symbols, extra):
+    if time_col is not None and time_col in df.columns:
+        df[time_col] = pd.to_datetime(df[time_col], utc=True)  # no string time column
+    if time_col is not None and (start is not None or end is not None):
+        times = df[time_col]
+        keep = pd.Series(True, index=df.index)
+        if start is not None:
+            keep &= times >= _utc(start)
+        if end is not None:
+            keep &= times < _utc(end)
+        df = df[keep]
+    if symbols is not None and "symbol" in df.columns:
+        df = df[df["symbol"].isin(list(symbols))]
+    return df.drop(columns=extra).reset_index(drop=True)
+
+
+def data_filters(data_config):
+    # the optional start / end / symbols / columns keys of the config "data" section
+    return {k: data_config[k] for k in FILTER_KEYS if data_config.get(k) is not None}
+
+
+def load_config_data(config):
+    data = config["data"]
+    return DataLoader().load_data(data["path"], **data_filters(data))
+
+
+def count_config_rows(config):
+    data = config["data"]
+    filters = data_filters(data)
+    filters.pop("columns", None)
+    return DataLoader().count_rows(data["path"], **filters)
+
+
+def load_dataset(dataset):
+    # dataset: (path, filters) as carried by a JobSpec, see JobSpec.dataset
+    path, filters = dataset
+    return DataLoader().load_data(path, **dict(filters))
+
+
+def _projection(names, time_col, columns):
+    if columns is not None:
+        return [c for c in columns if c in names]
+    default = ([time_col] if time_col else []) + [c for c in OHLCV if c in names]
+    return default or list(names)
+
+
+def _utc(value):
+    stamp = pd.Timestamp(value)
+    return stamp.tz_localize("UTC") if stamp.tzinfo is None else stamp.tz_convert("UTC")
+
+
+def _scalar(value, time_type):
+    # comparison value in the column's own type, so the filter is not evaluated on a cast column
+    stamp = pd.Timestamp(value)
+    if pa.types.is_timestamp(time_type):
+        if time_type.tz is not None:
+            stamp = _utc(stamp)
+        elif stamp.tzinfo is not None:
+            stamp = stamp.tz_convert("UTC").tz_localize(None)
+        return pa.scalar(stamp.to_pydatetime(), type=time_type)
+    return pa.scalar(stamp.value // 1_000_000, type=time_type)  # integer epoch ms
+
+
+def _finish(df, time_col, sort=True):
+    # one dtype per kind whatever the source: CSV, tz-aware and naive (taken as UTC) Parquet times alike
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            times = df[col]
+            if times.dt.tz is None:
+                times = times.dt.tz_localize("UTC")
+            df[col] = times.astype(TIME_DTYPE)
+        elif col in OHLCV:
+            df[col] = df[col].astype("float64")
+        elif pd.api.types.is_integer_dtype(df[col]):
+            df[col] = df[col].astype("int64")
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype("float64")
+    if sort and time_col is not None and time_col in df.columns and not df[time_col].is_monotonic_increasing:
+        df = df.sort_values(time_col, kind="stable").reset_index(drop=True)
+    return df
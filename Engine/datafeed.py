@@ -1,3 +1,10 @@
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+
 class DataFeed:
     def __init__(self,data):                
         self.data=data
@@ -11,3 +18,171 @@ class DataFeed:
         self.index+=1
         return candle
 
+
+def to_columns(data):
+    """
+    Pull every usable column of a DataFrame out once as a contiguous NumPy array.
+    Numeric columns become float64/int64, datetime columns datetime64[ns] (UTC, tz dropped),
+    text columns are skipped since nothing in the hot loop reads them.
+    """
+    columns = {}
+    for name in data.columns:
+        series = data[name]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            if getattr(series.dt, "tz", None) is not None:
+                series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+            values = series.to_numpy(dtype="datetime64[ns]")
+        elif pd.api.types.is_bool_dtype(series):
+            values = series.to_numpy(dtype=np.bool_)
+        elif pd.api.types.is_integer_dtype(series):
+            values = series.to_numpy(dtype=np.int64)
+        elif pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy(dtype=np.float64)
+        else:
+            continue
+        columns[str(name)] = np.ascontiguousarray(values)
+    return columns
+
+
+class Candle:
+    """
+    Lightweight read-only view of one bar. Holds a reference to the feed's column
+    arrays and a row index, so nothing is copied per candle.
+    Supports the same candle["close"] lookups strategies already use.
+    """
+    __slots__ = ("_columns", "index")
+
+    def __init__(self, columns, index):
+        self._columns = columns
+        self.index = index
+
+    def __getitem__(self, key):
+        return self._columns[key][self.index]
+
+    def __contains__(self, key):
+        return key in self._columns
+
+    def get(self, key, default=None):
+        column = self._columns.get(key)
+        if column is None:
+            return default
+        return column[self.index]
+
+    def keys(self):
+        return self._columns.keys()
+
+
+class ArrayDataFeed:
+    """
+    Columnar DataFeed: the OHLCV columns are extracted once as NumPy arrays and
+    every bar is handed out as a Candle view over them instead of an iloc Series.
+    Accepts a DataFrame or an already built {column: array} dict.
+    """
+    def __init__(self, data):
+        if isinstance(data, dict):
+            self.columns = data
+        else:
+            self.columns = to_columns(data)
+        self.length = len(next(iter(self.columns.values()))) if self.columns else 0
+        self.index = 0
+
+    def __len__(self):
+        return self.length
+
+    def has_next(self):
+        return self.index < self.length
+
+    def next_candle(self):
+        candle = Candle(self.columns, self.index)
+        self.index += 1
+        return candle
+
+    def close(self):
+        pass  # nothing to release, same interface as StreamingDataFeed
+
+
+_END = object()
+
+
+class StreamingDataFeed:
+    """
+    Out-of-core feed for datasets larger than RAM: candles are read batch by batch
+    (Parquet record batches / CSV chunks, see DataLoader.iter_batches) by a background
+    thread that stays up to `prefetch` batches ahead of the backtest loop, so the I/O
+    and decoding overlap with the strategy. Memory is about (prefetch + 1) batches.
+    Same has_next / next_candle interface, candles are Candle views over the current batch.
+    data_range=(start, stop) keeps only those bars, like slicing the in-memory columns.
+    """
+    def __init__(self, path, batch_size=100_000, prefetch=2, data_range=(), **filters):
+        from Engine.data_loader import DataLoader  # data_loader pulls in pyarrow, only needed here
+
+        self.batches = DataLoader().iter_batches(path, batch_size, **filters)
+        self.data_range = tuple(data_range or ())
+        self.columns = {}
+        self.length = 0
+        self.index = 0
+        self.queue = queue.Queue(maxsize=max(prefetch, 1))
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._produce, name="datafeed-prefetch", daemon=True)
+        self.thread.start()
+
+    def _produce(self):
+        try:
+            offset = 0
+            start, stop = self.data_range or (0, None)
+            for frame in self.batches:
+                n = len(frame)
+                lo = max(start - offset, 0)
+                hi = n if stop is None else min(stop - offset, n)
+                offset += n
+                if lo < hi:
+                    self._put(to_columns(frame.iloc[lo:hi] if (lo, hi) != (0, n) else frame))
+                if self.stopped.is_set() or (stop is not None and offset >= stop):
+                    break
+            self._put(_END)
+        except BaseException as exc:  # handed to the consumer, raised from has_next
+            self._put(exc)
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def has_next(self):
+        while self.index >= self.length:
+            if self.thread is None:
+                return False
+            item = self.queue.get()
+            if item is _END:
+                self.thread = None
+                self.columns = {}
+                return False
+            if isinstance(item, BaseException):
+                self.close()
+                raise item
+            self.columns = item
+            self.length = len(next(iter(item.values()))) if item else 0
+            self.index = 0
+        return True
+
+    def next_candle(self):
+        candle = Candle(self.columns, self.index)
+        self.index += 1
+        return candle
+
+    def close(self):
+        # stops the prefetch thread, e.g. when stop rules ended every run before the data did
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.batches.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
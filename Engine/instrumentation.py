@@ -0,0 +1,83 @@
+import cProfile
+import io
+import os
+import pstats
+from collections import defaultdict
+from pathlib import Path
+
+
+class StageTimer:
+    """
+    Cumulative wall time and call count per engine stage.
+    Engines only touch it when one is passed in, the normal run loop stays untouched.
+    """
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def add(self, stage, elapsed):
+        self.seconds[stage] += elapsed
+        self.calls[stage] += 1
+
+    def merge(self, summary):
+        # summary: output of summary(), e.g. a worker's result["timings"]
+        for stage, stats in summary.items():
+            self.seconds[stage] += stats["seconds"]
+            self.calls[stage] += stats["calls"]
+
+    def summary(self):
+        return {
+            stage: {
+                "seconds": round(self.seconds[stage], 6),
+                "calls": self.calls[stage],
+                "us_per_call": round(1e6 * self.seconds[stage] / self.calls[stage], 3) if self.calls[stage] else 0.0,
+            }
+            for stage in self.seconds
+        }
+
+    def report(self):
+        total = sum(self.seconds.values()) or 1.0
+        lines = [f"{'stage':<28}{'seconds':>12}{'calls':>12}{'us/call':>10}{'share':>8}"]
+        for stage, stats in sorted(self.summary().items(), key=lambda kv: -kv[1]["seconds"]):
+            lines.append(f"{stage:<28}{stats['seconds']:>12.3f}{stats['calls']:>12}"
+                         f"{stats['us_per_call']:>10.2f}{stats['seconds'] / total:>8.1%}")
+        return "\n".join(lines)
+
+
+class WorkerProfiler:
+    """
+    cProfile inside a worker process. The profile accumulates over every job the
+    process runs and is re-dumped to <output>/worker_<pid>.prof after each one
+    (pool workers get killed, not shut down, so there is no exit hook to rely on).
+    """
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        self.profile.dump_stats(self.output_dir / f"worker_{os.getpid()}.prof")
+
+
+def merge_profiles(output_dir, top=40):
+    """Merges every worker_*.prof of a sweep into sweep.prof + a readable sweep_profile.txt."""
+    output_dir = Path(output_dir)
+    files = sorted(output_dir.glob("worker_*.prof"))
+    if not files:
+        return None
+
+    stats = pstats.Stats(str(files[0]))
+    for file in files[1:]:
+        stats.add(str(file))
+    stats.dump_stats(output_dir / "sweep.prof")
+
+    text = io.StringIO()
+    pstats.Stats(str(output_dir / "sweep.prof"), stream=text).sort_stats("cumulative").print_stats(top)
+    report = output_dir / "sweep_profile.txt"
+    report.write_text(f"Merged {len(files)} worker profiles\n\n" + text.getvalue())
+    return report
@@ -1,37 +1,237 @@
+import math
+import zlib
+from array import array
+
+import numpy as np
+
+
+def encode_curve(values, resolution="full", points=1000):
+    """
+    Packs an equity curve for the trip from worker to parent.
+      full:       every bar
+      downsample: about `points` evenly spaced bars (first and last kept), with their bar index
+      none:       nothing, the summary stats are enough
+    Floats are byte-shuffled (all 1st bytes, then all 2nd bytes, ...) before zlib,
+    which is what makes slowly moving / flat float64 series compress well.
+    """
+    if resolution == "none":
+        return None
+    curve = np.asarray(values, dtype=np.float64)
+    payload = {"codec": "zlib-shuffle", "length": len(curve)}
+    if resolution == "downsample" and len(curve) > points:
+        bars = np.unique(np.linspace(0, len(curve) - 1, points).round().astype(np.int64))
+        curve = curve[bars]
+        payload["bars"] = zlib.compress(bars.astype("<i8").view(np.uint8).reshape(-1, 8).T.tobytes(), 1)
+    payload["count"] = len(curve)
+    payload["data"] = zlib.compress(curve.astype("<f8").view(np.uint8).reshape(-1, 8).T.tobytes(), 1)
+    return payload
+
+
+def _unshuffle(blob, count, dtype):
+    raw = np.frombuffer(zlib.decompress(blob), dtype=np.uint8)
+    return raw.reshape(8, count).T.copy().view(dtype).ravel()
+
+
+def decode_curve(payload):
+    """Equity values as a float64 array (accepts plain lists from older results too)."""
+    if payload is None:
+        return np.array([])
+    if not isinstance(payload, dict):
+        return np.asarray(payload, dtype=np.float64)
+    return _unshuffle(payload["data"], payload["count"], "<f8")
+
+
+def decode_bars(payload):
+    """Bar index of every value decode_curve returns."""
+    if payload is None:
+        return np.array([], dtype=np.int64)
+    if not isinstance(payload, dict):
+        return np.arange(len(payload))
+    if "bars" in payload:
+        return _unshuffle(payload["bars"], payload["count"], "<i8")
+    return np.arange(payload["count"])
+
+
 class Metrics:
-    def __init__(self,starting_capital):
+    """
+    Trade and equity statistics, updated online: every update_equity/record_trade
+    call moves a fixed set of running totals, nothing is recomputed from the curve.
+    Bar returns use Welford mean/variance (Sharpe) and a running sum of squared
+    negative returns (Sortino). With equity_resolution="none" the curve itself is
+    never stored. periods_per_year annualises Sharpe/Sortino/Calmar (per bar if None).
+    """
+    def __init__(self,starting_capital,equity_resolution="full",equity_points=1000,periods_per_year=None):
         self.starting_capital=starting_capital
-        self.equity_curve=[]
+        self._equity=array("d") #compact float64 buffer instead of a list of boxed floats
         self.trades=[]
+        self.equity_resolution=equity_resolution
+        self.equity_points=equity_points
+        self.periods_per_year=periods_per_year
+        self._keep_curve=equity_resolution!="none"
+
+        #equity side
+        self.bars=0
+        self.bars_in_market=0
+        self.last_equity=starting_capital
+        self.peak=starting_capital
+        self.peak_bar=0
+        self.max_dd=0
+        self.max_dd_pct=0.0
+        self.max_dd_duration=0 #longest stretch of bars spent below the last peak
+        self.ret_mean=0.0 #welford
+        self.ret_m2=0.0
+        self.downside_sq=0.0
+
+        self.termination_reason="" #set by terminate() when a StopRules ends the run early
+        self.terminated_bar=-1
+
+        #trade side
+        self.total_pnl=0
+        self.wins=0
+        self.gross_profit=0.0
+        self.gross_loss=0.0
+
+    @property
+    def equity_curve(self): #numpy copy, a live view would stop the buffer from growing
+        return np.array(self._equity,dtype=np.float64)
 
     def record_trade(self,pnl):
         self.trades.append(pnl)
+        self.total_pnl+=pnl
+        if pnl>0:
+            self.wins+=1
+            self.gross_profit+=pnl
+        else:
+            self.gross_loss-=pnl
 
-    def update_equity(self,current_equity):
-        self.equity_curve.append(current_equity)
+    def update_equity(self,current_equity,in_market=False):
+        if self._keep_curve:
+            self._equity.append(current_equity)
+        self.bars+=1
+        if in_market:
+            self.bars_in_market+=1
+
+        prev=self.last_equity
+        r=current_equity/prev-1.0 if prev else 0.0
+        delta=r-self.ret_mean
+        self.ret_mean+=delta/self.bars
+        self.ret_m2+=delta*(r-self.ret_mean)
+        if r<0:
+            self.downside_sq+=r*r
+        self.last_equity=current_equity
+
+        if current_equity>=self.peak:
+            self.peak=current_equity #update new peak if found
+            self.peak_bar=self.bars
+            return
+        drawdown=self.peak-current_equity #find the steep
+        if drawdown>self.max_dd:
+            self.max_dd=drawdown
+        if drawdown/self.peak>self.max_dd_pct:
+            self.max_dd_pct=drawdown/self.peak
+        if self.bars-self.peak_bar>self.max_dd_duration:
+            self.max_dd_duration=self.bars-self.peak_bar
+
+    def extend_equity(self,equity_values,bars_in_market=0):
+        """
+        Whole curve at once (vectorized backend): the same stats as update_equity bar by bar,
+        computed with numpy and merged into the running state. Sharpe/Sortino can differ from
+        the bar loop in the last ulp, summary() rounds well above that.
+        """
+        values=np.asarray(equity_values,dtype=np.float64)
+        if self._keep_curve:
+            self._equity.frombytes(values.tobytes())
+        self.bars_in_market+=bars_in_market
+        n=len(values)
+        if n==0:
+            return
+
+        #bar returns, merged into the welford state (Chan et al. pairwise update)
+        prev=np.concatenate(([self.last_equity],values[:-1]))
+        with np.errstate(divide="ignore",invalid="ignore"):
+            r=np.where(prev!=0,values/prev-1.0,0.0)
+        mean=r.mean()
+        m2=float(np.dot(r-mean,r-mean))
+        total=self.bars+n
+        delta=mean-self.ret_mean
+        self.ret_mean+=delta*n/total
+        self.ret_m2+=m2+delta*delta*self.bars*n/total
+        self.downside_sq+=float(np.square(r[r<0]).sum())
+
+        #drawdown against the running peak, duration = bars since the last bar at the peak
+        bar_numbers=np.arange(self.bars+1,total+1)
+        running=np.maximum.accumulate(np.concatenate(([self.peak],values)))
+        at_peak=values>=running[:-1] #same test as update_equity, against the peak before the bar
+        peaks=running[1:]
+        drawdown=peaks-values
+        self.max_dd=max(self.max_dd,float(drawdown.max()))
+        with np.errstate(divide="ignore",invalid="ignore"):
+            dd_pct=np.where(peaks!=0,drawdown/peaks,0.0)
+        self.max_dd_pct=max(self.max_dd_pct,float(dd_pct.max()))
+        peak_bars=np.maximum(np.maximum.accumulate(np.where(at_peak,bar_numbers,0)),self.peak_bar)
+        self.max_dd_duration=max(self.max_dd_duration,int((bar_numbers-peak_bars).max()))
+
+        self.bars=total
+        self.last_equity=float(values[-1])
+        self.peak=float(running[-1])
+        self.peak_bar=int(peak_bars[-1])
+
+    def terminate(self,reason,bar=None):
+        self.termination_reason=reason
+        self.terminated_bar=self.bars-1 if bar is None else bar
+
+    def risk_summary(self):
+        n=self.bars
+        scale=math.sqrt(self.periods_per_year) if self.periods_per_year else 1.0
+        std=math.sqrt(self.ret_m2/(n-1)) if n>1 else 0.0
+        downside=math.sqrt(self.downside_sq/n) if n else 0.0
+        sharpe=self.ret_mean/std*scale if std>0 else 0.0
+        sortino=self.ret_mean/downside*scale if downside>0 else 0.0
+
+        total_return=self.last_equity/self.starting_capital-1.0 if self.starting_capital else 0.0
+        if self.periods_per_year and n and total_return>-1:
+            annual_return=(1.0+total_return)**(self.periods_per_year/n)-1.0
+        else:
+            annual_return=total_return
+        calmar=annual_return/self.max_dd_pct if self.max_dd_pct>0 else 0.0
+
+        losses=len(self.trades)-self.wins
+        if self.gross_loss>0:
+            profit_factor=self.gross_profit/self.gross_loss
+        else:
+            profit_factor=float("inf") if self.gross_profit>0 else 0.0
+
+        return {
+            "total_return_pct": float(round(total_return*100, 4)),
+            "annual_return_pct": float(round(annual_return*100, 4)),
+            "sharpe": float(round(sharpe, 4)),
+            "sortino": float(round(sortino, 4)),
+            "calmar": float(round(calmar, 4)),
+            "max_drawdown_pct": float(round(-self.max_dd_pct*100, 4)),
+            "max_drawdown_duration": int(self.max_dd_duration),
+            "time_in_market_pct": float(round(self.bars_in_market/n*100, 2)) if n else 0.0,
+            "profit_factor": float(round(profit_factor, 4)),
+            "avg_win": float(self.gross_profit/self.wins) if self.wins else 0.0,
+            "avg_loss": float(-self.gross_loss/losses) if losses else 0.0,
+        }
 
     def summary(self):
-        total_pnl=sum(self.trades) #net result of all trades
         total_trades=len(self.trades)
-        wins=len([p for p in self.trades if p>0])  #how many profitable trades
-        win_rate=(wins/total_trades)*100 if total_trades>0 else 0
-        max_drawdown=self.max_drawdown()
+        win_rate=(self.wins/total_trades)*100 if total_trades>0 else 0
 
-        return {
-            "total_pnl": float(total_pnl),
+        result={
+            "total_pnl": float(self.total_pnl),
             "total_trades": int(total_trades),
             "win_rate": float(round(win_rate, 2)),
-            "max_drawdown": float(round(-max_drawdown, 2)),
-            "equity_curve": list(self.equity_curve)
+            "max_drawdown": float(round(-self.max_dd, 2)),
         }
+        result.update(self.risk_summary())
+        result["terminated"]=bool(self.termination_reason)
+        result["termination_reason"]=self.termination_reason
+        result["terminated_bar"]=int(self.terminated_bar)
+        result["equity_curve"]=encode_curve(self._equity, self.equity_resolution, self.equity_points)
+        return result
 
 
-    def max_drawdown(self):     
-        peak=self.starting_capital
-        max_dd=0
-        for equity in self.equity_curve:
-            if equity>peak:
-                peak=equity #update new peak if found
-            drawdown=peak-equity #find the steep
-            max_dd=max(max_dd,drawdown)
-        return max_dd
\ No newline at end of file
+    def max_drawdown(self):
+        return self.max_dd #running peak to trough, kept up to date by update_equity
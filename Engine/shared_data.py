@@ -0,0 +1,60 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+ALIGNMENT = 64  # keep every column cache line aligned inside the block
+
+
+class SharedColumns:
+    """
+    Publishes a {column: array} dict (see datafeed.to_columns) into one
+    multiprocessing.shared_memory block. The parent owns the block; workers get
+    the small picklable `handle` and map the same pages with attach_columns().
+    """
+    def __init__(self, columns):
+        layout = []
+        offset = 0
+        for name, values in columns.items():
+            values = np.ascontiguousarray(values)
+            offset = -(-offset // ALIGNMENT) * ALIGNMENT
+            layout.append((name, values.dtype.str, len(values), offset))
+            offset += values.nbytes
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for (name, dtype, length, start), values in zip(layout, columns.values()):
+            target = np.ndarray(length, dtype=dtype, buffer=self.shm.buf, offset=start)
+            target[:] = values
+
+        self.handle = {"name": self.shm.name, "layout": layout}
+
+    def views(self):
+        # read-only arrays on the parent's own mapping (drop them before close())
+        return _views(self.shm, self.handle["layout"])
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_columns(handle):
+    """
+    Map a published block read-only without copying.
+    Returns (columns, shm); keep shm referenced for as long as the arrays are used.
+    """
+    shm = shared_memory.SharedMemory(name=handle["name"])
+    return _views(shm, handle["layout"]), shm
+
+
+def _views(shm, layout):
+    columns = {}
+    for name, dtype, length, offset in layout:
+        values = np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=offset)
+        values.flags.writeable = False
+        columns[name] = values
+    return columns
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class StopRules:
+    """
+    Early termination for hopeless runs. Thresholds (None = rule off):
+      max_drawdown_pct  stop once the peak to trough drawdown reaches this % (e.g. 40)
+      min_equity_pct    stop once equity falls below this % of starting capital
+      no_trade_bars     stop if not a single trade has closed after this many bars
+    check() reads the running state Metrics already keeps, so it is a few
+    comparisons per bar. first_stop() is the same rule set over a whole equity
+    array, for the vectorized backend.
+    """
+    def __init__(self, max_drawdown_pct=None, min_equity_pct=None, no_trade_bars=None):
+        self.max_drawdown_pct = max_drawdown_pct
+        self.min_equity_pct = min_equity_pct
+        self.no_trade_bars = no_trade_bars
+        self._max_dd = max_drawdown_pct / 100 if max_drawdown_pct is not None else None
+        self._floor = min_equity_pct / 100 if min_equity_pct is not None else None
+
+    @classmethod
+    def from_dict(cls, rules):
+        rules = dict(rules or {})
+        if not any(v is not None for v in rules.values()):
+            return None
+        return cls(**rules)
+
+    def check(self, metrics):
+        """Reason string if the run should stop after the bar just recorded, else None."""
+        if self._max_dd is not None and metrics.max_dd_pct >= self._max_dd:
+            return "max_drawdown"
+        if self._floor is not None and metrics.last_equity < metrics.starting_capital * self._floor:
+            return "min_equity"
+        if self.no_trade_bars is not None and metrics.bars >= self.no_trade_bars and not metrics.trades:
+            return "no_trades"
+        return None
+
+    def first_stop(self, equity, starting_capital, first_exit_bar=None):
+        """
+        (reason, bar) of the first bar where check() would fire for this equity
+        curve, or None. first_exit_bar is the bar the first trade closed on.
+        """
+        equity = np.asarray(equity, dtype=np.float64)
+        candidates = []
+        if self._max_dd is not None and len(equity):
+            peak = np.maximum.accumulate(np.maximum(equity, starting_capital))
+            hits = np.flatnonzero((peak - equity) / peak >= self._max_dd)
+            if len(hits):
+                candidates.append((int(hits[0]), 0, "max_drawdown"))
+        if self._floor is not None:
+            hits = np.flatnonzero(equity < starting_capital * self._floor)
+            if len(hits):
+                candidates.append((int(hits[0]), 1, "min_equity"))
+        if self.no_trade_bars is not None and len(equity) >= self.no_trade_bars:
+            bar = self.no_trade_bars - 1
+            if first_exit_bar is None or first_exit_bar > bar:
+                candidates.append((bar, 2, "no_trades"))
+        if not candidates:
+            return None
+        bar, _, reason = min(candidates)  # same priority order as check()
+        return reason, bar
@@ -0,0 +1,48 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+def generate_ohlcv(n, volatility=0.004, drift=0.00005, start_price=30000.0,
+                   freq="15min", start="2020-01-01", seed=42):
+    """
+    Deterministic synthetic OHLCV candles (geometric random walk) in the same
+    layout as the real dataset: open_time, open, high, low, close, volume.
+    `volatility` is the per-bar std dev of log returns. Same seed -> same data.
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(drift, volatility, n)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([start_price], close[:-1]))
+
+    # wicks scale with the bar volatility
+    wick = volatility / 4
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, wick, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, wick, n)))
+    volume = rng.lognormal(3, 1, n)
+
+    return pd.DataFrame({
+        "open_time": pd.date_range(start, periods=n, freq=freq, tz="UTC"),
+        "open": open_.round(2),
+        "high": high.round(2),
+        "low": low.round(2),
+        "close": close.round(2),
+        "volume": volume,
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic OHLCV dataset")
+    parser.add_argument("output", help=".parquet or .csv path")
+    parser.add_argument("--candles", type=int, default=100000)
+    parser.add_argument("--volatility", type=float, default=0.004)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    df = generate_ohlcv(args.candles, volatility=args.volatility, seed=args.seed)
+    if args.output.endswith(".csv"):
+        df.to_csv(args.output, index=False)
+    else:
+        df.to_parquet(args.output, index=False)
+    print("Wrote", len(df), "candles to", args.output)
@@ -0,0 +1,142 @@
+from time import perf_counter
+
+import numpy as np
+
+
+class VectorizedBacktestingEngine:
+    """
+    Array backend for strategies that implement vectorized_signals(columns).
+    Signals come in as whole-array masks; this class then walks only the entry/exit
+    events (not every candle) applying the same Portfolio stop-loss / exit rules and
+    ExecutionEngine costs as BacktestingEngine, and fills the equity curve by slices.
+    Results (trades, PnL, equity curve) are identical to the event-driven engine.
+    """
+    def __init__(self, columns, execution, strategy, portfolio, metrics, indicators=None, timer=None, stop=None):
+        self.columns = columns
+        self.timer = timer  # optional StageTimer
+        self.indicators = indicators  # optional precomputed arrays shared across a sweep
+        self.stop = stop  # optional StopRules
+        self.strategy = strategy
+        self.execution = execution
+        self.portfolio = portfolio
+        self.metrics = metrics
+
+    def run(self):
+        start = perf_counter()
+        close = np.asarray(self.columns["close"], dtype=np.float64)
+        if self.indicators is not None:
+            signals = self.strategy.vectorized_signals(self.columns, self.indicators)
+        else:
+            signals = self.strategy.vectorized_signals(self.columns)
+        buy_bars = np.flatnonzero(signals["buy"])
+        sell_bars = np.flatnonzero(signals["sell"])
+        sl = signals["sl"]
+        if self.timer is not None:
+            self.timer.add("strategy.vectorized_signals", perf_counter() - start)
+            start = perf_counter()
+
+        walk = self._walk(close, buy_bars, sell_bars, sl, len(close))
+        stopped = None
+        if self.stop is not None:
+            exits = walk["exit_bars"]
+            stopped = self.stop.first_stop(walk["equity"], self.metrics.starting_capital,
+                                           exits[0] if exits else None)
+            if stopped is not None:
+                # the event engine never sees bars past the stop, replay the walk up to it
+                n = stopped[1] + 1
+                walk = self._walk(close[:n], buy_bars[buy_bars < n], sell_bars[sell_bars < n], sl, n)
+
+        for pnl in walk["trades"]:
+            self.portfolio.trades.append(pnl)
+            if self.metrics:
+                self.metrics.record_trade(pnl)
+        self.portfolio.cash = walk["cash"]
+        if walk["open"] is not None:
+            entry_price, quantity, stop_price = walk["open"]
+            self.portfolio.position = 1
+            self.portfolio.entry_price = entry_price
+            self.portfolio.quantity = quantity
+            self.portfolio.stop_price = stop_price
+        if walk["strategy_long"]:
+            self.strategy.position = 1
+        self.metrics.extend_equity(walk["equity"], walk["in_market"])
+        if stopped is not None:
+            self.metrics.terminate(*stopped)
+        if self.timer is not None:
+            self.timer.add("portfolio_pass", perf_counter() - start)
+
+    def _walk(self, close, buy_bars, sell_bars, sl, n):
+        # pure pass over the first n bars, returns what run() applies to portfolio/metrics
+        equity = np.empty(n)
+        cash = self.portfolio.cash
+        trades = []
+        exit_bars = []
+        open_position = None
+        strategy_long = False
+        flat_from = 0   # first bar of the current flat stretch
+        in_market = 0   # bars that end with an open position
+        search = 0      # strategy is flat from this bar on
+
+        while True:
+            k = np.searchsorted(buy_bars, search)
+            if k == len(buy_bars):
+                break
+            entry_bar = int(buy_bars[k])
+
+            # strategy stays long until its own SELL unless the portfolio stops it out
+            k = np.searchsorted(sell_bars, entry_bar + 1)
+            sell_bar = int(sell_bars[k]) if k < len(sell_bars) else n
+
+            if cash <= 0:
+                # Portfolio refuses the BUY, strategy still thinks it is long
+                if sell_bar == n:
+                    strategy_long = True
+                search = sell_bar + 1
+                continue
+
+            entry_price = self.execution.execute("BUY", close[entry_bar])
+            quantity = cash / entry_price
+            stop_price = sl[entry_bar] if sl[entry_bar] else entry_price * 0.98
+
+            # Stop loss is checked on close for every bar before the SELL bar
+            window = close[entry_bar + 1:sell_bar]
+            hits = np.flatnonzero(window <= stop_price)
+            if len(hits):
+                exit_bar = entry_bar + 1 + int(hits[0])
+                exit_price = close[exit_bar]
+            elif sell_bar < n:
+                exit_bar = sell_bar
+                exit_price = self.execution.execute("SELL", close[sell_bar])
+            else:
+                # still open at the end of the data
+                equity[flat_from:entry_bar] = cash
+                equity[entry_bar:] = cash + quantity * (close[entry_bar:] - entry_price)
+                open_position = (entry_price, quantity, stop_price)
+                strategy_long = True
+                in_market += n - entry_bar
+                flat_from = n
+                break
+
+            equity[flat_from:entry_bar] = cash
+            equity[entry_bar:exit_bar] = cash + quantity * (close[entry_bar:exit_bar] - entry_price)
+
+            in_market += exit_bar - entry_bar
+            pnl = quantity * (exit_price - entry_price)
+            cash += pnl
+            trades.append(pnl)
+            exit_bars.append(exit_bar)
+
+            equity[exit_bar] = cash
+            flat_from = exit_bar + 1
+            search = exit_bar + 1
+
+        equity[flat_from:] = cash
+        return {
+            "equity": equity,
+            "cash": cash,
+            "trades": trades,
+            "exit_bars": exit_bars,
+            "open": open_position,
+            "strategy_long": strategy_long,
+            "in_market": in_market,
+        }
@@ -1,16 +1,305 @@
-from multiprocessing import Pool
-from Runner.worker import run_single_backtest
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack
+from itertools import chain, islice
+from pathlib import Path
+from Engine.shared_data import SharedColumns
+from Engine.instrumentation import StageTimer, merge_profiles
+from Runner.indicator_cache import plan_indicators, build_indicator_cache
+from Runner.worker import load_columns, run_jobs_safely, run_group_safely, init_shared_data, error_result
 
 def chunk_jobs(jobs,size):
     for i in range(0,len(jobs),size):
         yield jobs[i:i+size]
 
-def run_batched(jobs,workers,batch_size):
-    all_results=[]
-    
-    with Pool(processes=workers) as pool:
-        for batch in chunk_jobs(jobs,batch_size):   
-            results=pool.map(run_single_backtest,batch)
-            all_results.extend(results)
-    return all_results
+def group_jobs(jobs,group_size):
+    #jobs on the same dataset (and bar range) are packed together so one worker task runs them in a single data pass
+    by_data={}
+    for spec in jobs:
+        by_data.setdefault((spec.dataset,spec.data_range),[]).append(spec)
+    groups=[]
+    for data_jobs in by_data.values():
+        groups.extend(chunk_jobs(data_jobs,group_size))
+    return groups
 
+def publish_datasets(jobs,stack):
+    #load every distinct dataset ONCE in the parent and put it in shared memory,
+    #along with every indicator the sweep needs (each computed once, not once per job)
+    handles={}
+    indicator_handles={}
+    plan=plan_indicators(jobs)
+    datasets={}
+    for spec in jobs:
+        if spec.backend!="streaming": #streaming jobs read their own batches
+            datasets.setdefault(spec.dataset,spec)
+    for dataset,spec in datasets.items():
+        columns=load_columns(spec) #memory mapped from the candle cache after the first run
+        handles[dataset]=stack.enter_context(SharedColumns(columns)).handle
+        if dataset in plan:
+            indicators=build_indicator_cache(columns,plan[dataset])
+            indicator_handles[dataset]=stack.enter_context(SharedColumns(indicators)).handle
+    return handles,indicator_handles
+
+class SweepProfiler:
+    """
+    Parent side of the profiling options (config "profiling" section):
+      instrument: per-stage timings from every job, summed into one table for the sweep
+      cprofile:   cProfile in every worker, merged into <output>/<sweep>/sweep_profile.txt
+    """
+    def __init__(self,profiling=None):
+        profiling=profiling or {}
+        self.instrument=profiling.get("instrument",False)
+        self.profile_dir=None
+        if profiling.get("cprofile",False) or self.instrument:
+            self.profile_dir=Path(profiling.get("output","results/profiles"))/time.strftime("sweep_%Y%m%d_%H%M%S")
+        self.cprofile=profiling.get("cprofile",False)
+        self.timer=StageTimer()
+
+    def worker_settings(self):
+        return {
+            "instrument":self.instrument,
+            "profile_dir":str(self.profile_dir) if self.cprofile else None,
+        }
+
+    def collect(self,result):
+        if "timings" in result:
+            self.timer.merge(result["timings"])
+
+    def finish(self):
+        if self.profile_dir is None:
+            return
+        self.profile_dir.mkdir(parents=True,exist_ok=True)
+        if self.instrument and self.timer.seconds:
+            print(self.timer.report())
+            (self.profile_dir/"stage_timings.json").write_text(json.dumps(self.timer.summary(),indent=2))
+        if self.cprofile:
+            report=merge_profiles(self.profile_dir)
+            if report:
+                print("Merged worker profile:",report)
+
+def lookup_cache(jobs,cache):
+    #split jobs into (results already in the result cache, jobs still to run)
+    if cache is None:
+        return [],list(jobs)
+    hits=[]
+    pending=[]
+    for spec in jobs:
+        result=cache.get(spec)
+        if result is None:
+            pending.append(spec)
+        else:
+            result["job_id"]=spec.job_id
+            hits.append(result)
+    print(f"Result cache: {len(hits)} hits, {len(pending)} to run")
+    return hits,pending
+
+class Progress:
+    #prints done/total, throughput and an ETA every `every` results
+    def __init__(self,total,every=1):
+        self.total=total
+        self.every=max(1,every)
+        self.done=0
+        self.start=time.time()
+
+    def update(self,count=1):
+        self.done+=count
+        if self.done%self.every and self.done<self.total:
+            return
+        elapsed=time.time()-self.start
+        rate=self.done/elapsed if elapsed>0 else 0.0
+        eta=(self.total-self.done)/rate if rate>0 else 0.0
+        print(f"[{self.done}/{self.total}] {self.done/self.total:.0%} "
+              f"{rate:.2f} jobs/s elapsed {elapsed:.1f}s ETA {eta:.1f}s",flush=True)
+
+def report_failures(errors,attempts=None):
+    #errors: job_id -> (strategy_id, traceback), one line per job that ran out of retries
+    if not errors:
+        return
+    print(f"{len(errors)} jobs failed:")
+    for job_id,(sid,error) in errors.items():
+        tries=f" after {attempts[job_id]} attempts" if attempts and job_id in attempts else ""
+        print(f"  {sid} [{job_id}]{tries}: {error.strip().splitlines()[-1]}")
+
+class WorkerPool:
+    """
+    Worker processes plus the shared memory they map: the datasets and indicators of
+    `jobs` are published once, and when a worker dies (OOM kill, segfault) the broken
+    executor is replaced by a fresh one on the same blocks.
+    """
+    def __init__(self,jobs,workers,profiling=None):
+        self.workers=workers
+        self.profiler=SweepProfiler(profiling)
+        self.stack=ExitStack()
+        handles,indicator_handles=publish_datasets(jobs,self.stack)
+        self.initargs=(handles,indicator_handles,self.profiler.worker_settings())
+        self.executor=None
+        self.start()
+
+    def start(self):
+        self.executor=ProcessPoolExecutor(max_workers=self.workers,initializer=init_shared_data,initargs=self.initargs)
+
+    def restart(self):
+        self.executor.shutdown(wait=False,cancel_futures=True)
+        self.start()
+
+    def run(self,tasks,fn,isolate=False):
+        """
+        Yields the result list of every task as it finishes. At most 2 x workers tasks are
+        in flight (submitted as earlier ones finish), so neither the queue nor the finished
+        results pile up in the parent. If the pool breaks, the tasks in flight come back as
+        crash results and the rest go on in a restarted pool.
+        isolate=True runs one task at a time, so a crash is pinned on the job that caused it.
+        """
+        tasks=iter(tasks)
+        window=1 if isolate else 2*self.workers
+        pending={}
+        broken=False
+        while True:
+            if not broken:
+                for task in islice(tasks,window-len(pending)):
+                    try:
+                        pending[self.executor.submit(fn,task)]=task
+                    except BrokenProcessPool:
+                        broken=True #died before we saw it, the task goes to the restarted pool
+                        tasks=chain([task],tasks)
+                        break
+            if not pending:
+                if not broken:
+                    return
+                self.restart()
+                broken=False
+                continue
+            done,_=wait(pending,return_when=FIRST_COMPLETED)
+            for future in done:
+                task=pending.pop(future) #dropped as it is handed out, results are not kept here
+                try:
+                    results=future.result()
+                except BrokenProcessPool as exc:
+                    broken=True
+                    results=[crash_result(spec,exc) for spec in task]
+                yield results
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True,cancel_futures=True)
+            self.executor=None
+        self.stack.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+def crash_result(spec,exc):
+    #the worker process died while this job was in flight, it may or may not be the one that killed it
+    return {**error_result(spec,f"worker process died while running this job ({type(exc).__name__}: {exc})"),
+            "crashed":True}
+
+def run_streaming(jobs,workers,sink,chunksize=1,group_size=1,progress=True,cache=None,profiling=None,
+                  manifest=None,retries=0,pool=None):
+    """
+    Dynamically scheduled sweep: tasks are submitted to a process pool and collected as
+    they complete, so an idle worker picks up the next task instead of waiting for a slow
+    batch, and each result is handed to `sink` as soon as it arrives.
+    Results are not kept here, memory stays bounded and the sink's writing overlaps with compute.
+    With a ResultCache, cached results go to the sink first and only the rest run.
+    With a JobManifest every finished job is recorded durably; jobs it already has
+    as done are re-delivered instead of run (resume). A job that raises is retried up to
+    `retries` times (attempts counted in the manifest across resumes), then reported; the
+    rest of the sweep carries on. When a worker process dies the jobs that were in flight
+    are rerun one task at a time, so only the job that kills its worker is charged.
+    A WorkerPool passed as `pool` (its data must cover `jobs`) is used and left open, so
+    repeated calls reuse the same workers and shared blocks; otherwise one is made here.
+    Returns the number of results delivered.
+    """
+    finished=[]
+    if manifest is not None:
+        manifest.register(jobs)
+        finished,jobs=manifest.split(jobs)
+        if finished:
+            print(f"Manifest: {len(finished)} jobs already done, {len(jobs)} to go")
+    hits,pending=lookup_cache(jobs,cache)
+    specs={spec.job_id:spec for spec in pending}
+    tracker=Progress(len(pending),every=max(1,len(pending)//20)) if progress and pending else None
+    errors={}
+    tries={}
+    delivered=0
+    owned=None #the pool this call made and has to close
+    isolate=False #set after the first worker death
+
+    try:
+        for result in finished:
+            sink.handle(result)
+            delivered+=1
+        for result in hits:
+            if manifest is not None:
+                manifest.mark_done(result["job_id"],result)
+            sink.handle(result)
+            delivered+=1
+        if not pending:
+            return delivered
+
+        if pool is None:
+            pool=owned=WorkerPool(pending,workers,profiling)
+        while pending:
+            if isolate:
+                stream=pool.run([[spec] for spec in pending],run_jobs_safely,isolate) #one job per task
+            elif group_size>1:
+                stream=pool.run(group_jobs(pending,group_size),run_group_safely)
+            else:
+                stream=pool.run(chunk_jobs(pending,chunksize),run_jobs_safely)
+            failed=[]
+            suspects=[]
+            for results in stream:
+                for result in results:
+                    job_id=result["job_id"]
+                    if result.get("crashed") and not isolate:
+                        suspects.append(specs[job_id]) #not charged, rerun in isolation to find the culprit
+                        continue
+                    if "error" in result:
+                        errors[job_id]=(result["strategy_id"],result["error"])
+                        if manifest is not None:
+                            manifest.mark_failed(job_id,result["error"])
+                            tries[job_id]=manifest.attempts(job_id)
+                        else:
+                            tries[job_id]=tries.get(job_id,0)+1
+                        if tries[job_id]<=retries:
+                            failed.append(specs[job_id])
+                        continue
+                    errors.pop(job_id,None)
+                    pool.profiler.collect(result)
+                    if cache is not None:
+                        cache.put(specs[job_id],result)
+                    if manifest is not None:
+                        manifest.mark_done(job_id,result)
+                    sink.handle(result)
+                    delivered+=1
+                if tracker:
+                    tracker.update(len(results))
+            if suspects:
+                isolate=True
+                print(f"A worker process died, rerunning {len(suspects)} jobs that were in flight one at a time")
+            elif not failed:
+                break
+            else:
+                print(f"Retrying {len(failed)} failed jobs")
+            if tracker:
+                tracker.total+=len(failed)+len(suspects)
+            pending=suspects+failed
+    finally:
+        sink.close()
+        if owned is not None:
+            owned.close()
+            owned.profiler.finish()
+        if cache is not None:
+            cache.evict()
+        if manifest is not None:
+            failures={job_id:(attempts,error) for job_id,attempts,error in manifest.failures() if job_id in errors}
+            report_failures({job_id:(errors[job_id][0],error or "") for job_id,(_,error) in failures.items()},
+                            {job_id:attempts for job_id,(attempts,_) in failures.items()})
+        else:
+            report_failures(errors,tries)
+    return delivered
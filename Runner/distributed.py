@@ -0,0 +1,301 @@
+import argparse
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from multiprocessing import Process
+from pathlib import Path
+
+from Runner.job_spec import JobSpec
+
+# Multi-host sweeps through a job queue in a SQLite file on shared storage.
+#   coordinator (run_distributed): enqueues the JobSpecs, hands finished results to the
+#     sink, re-queues the jobs of workers whose heartbeat stopped, closes the queue at the end
+#   workers (QueueWorker, `python -m Runner.distributed worker`): claim a few jobs at a time,
+#     run them, write the results back; a thread keeps their heartbeat fresh
+# Every host needs the queue file and the data_path of the jobs at the same path.
+# The journal stays in the default rollback mode, WAL does not work on network filesystems.
+
+DEFAULT_QUEUE = "results/queue.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY, spec TEXT, status TEXT, worker TEXT, attempts INTEGER DEFAULT 0,
+    error TEXT, result BLOB, delivered INTEGER DEFAULT 0, updated REAL);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY, host TEXT, pid INTEGER, heartbeat REAL, jobs_done INTEGER DEFAULT 0,
+    alive INTEGER DEFAULT 1);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def connect(path):
+    db = sqlite3.connect(path, timeout=60, isolation_level=None)  # explicit BEGIN/COMMIT below
+    db.executescript(SCHEMA)
+    return db
+
+
+class JobQueue:
+    """The queue file, shared by the coordinator and every worker."""
+    def __init__(self, path=DEFAULT_QUEUE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = connect(str(self.path))
+
+    # coordinator side
+
+    def reset(self, jobs):
+        self.db.execute("BEGIN IMMEDIATE")
+        self.db.execute("DELETE FROM jobs")
+        self.db.execute("DELETE FROM workers")  # last sweep's workers, live ones re-register on their next heartbeat
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('state', 'open')")
+        self.db.executemany(
+            "INSERT OR IGNORE INTO jobs (job_id, spec, status, updated) VALUES (?, ?, 'queued', ?)",
+            [(spec.job_id, spec.to_json(), time.time()) for spec in jobs],
+        )
+        self.db.execute("COMMIT")
+
+    def close_queue(self):
+        # workers exit once they see this
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('state', 'closed')")
+
+    def take_results(self):
+        """Finished results not handed out yet, marked as delivered."""
+        self.db.execute("BEGIN IMMEDIATE")
+        rows = self.db.execute("SELECT job_id, result FROM jobs WHERE status = 'done' AND delivered = 0").fetchall()
+        self.db.executemany("UPDATE jobs SET delivered = 1 WHERE job_id = ?", [(job_id,) for job_id, _ in rows])
+        self.db.execute("COMMIT")
+        return [pickle.loads(blob) for _, blob in rows]
+
+    def requeue_dead(self, timeout, max_attempts):
+        """Jobs held by workers with a stale heartbeat go back to the queue (or fail after max_attempts)."""
+        cutoff = time.time() - timeout
+        self.db.execute("BEGIN IMMEDIATE")
+        dead = [row[0] for row in self.db.execute(
+            "SELECT worker_id FROM workers WHERE alive = 1 AND heartbeat < ?", (cutoff,))]
+        requeued = 0
+        for worker_id in dead:
+            self.db.execute("UPDATE workers SET alive = 0 WHERE worker_id = ?", (worker_id,))
+            self.db.execute(
+                "UPDATE jobs SET status = 'failed', error = 'worker ' || worker || ' died', updated = ?"
+                " WHERE status = 'running' AND worker = ? AND attempts >= ?",
+                (time.time(), worker_id, max_attempts),
+            )
+            requeued += self.db.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, updated = ? WHERE status = 'running' AND worker = ?",
+                (time.time(), worker_id),
+            ).rowcount
+        self.db.execute("COMMIT")
+        return dead, requeued
+
+    def retry_failed(self, max_attempts):
+        # failed jobs with attempts left go back to the queue
+        return self.db.execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'failed' AND attempts < ?",
+            (max_attempts,),
+        ).rowcount
+
+    def counts(self):
+        return dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def failures(self):
+        return self.db.execute("SELECT job_id, attempts, error FROM jobs WHERE status = 'failed'").fetchall()
+
+    def live_workers(self):
+        return self.db.execute("SELECT COUNT(*) FROM workers WHERE alive = 1").fetchone()[0]
+
+    # worker side
+
+    def is_closed(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'state'").fetchone()
+        return row is not None and row[0] == "closed"
+
+    def register(self, worker_id):
+        self.db.execute(
+            "INSERT OR REPLACE INTO workers (worker_id, host, pid, heartbeat) VALUES (?, ?, ?, ?)",
+            (worker_id, socket.gethostname(), os.getpid(), time.time()),
+        )
+
+    def heartbeat(self, worker_id):
+        # alive again too, in case the coordinator gave up on it during a long stall
+        cursor = self.db.execute("UPDATE workers SET heartbeat = ?, alive = 1 WHERE worker_id = ?",
+                                 (time.time(), worker_id))
+        if cursor.rowcount == 0:  # dropped by reset() while waiting for the sweep
+            self.register(worker_id)
+
+    def claim(self, worker_id, count):
+        self.db.execute("BEGIN IMMEDIATE")  # one claimer at a time, a job is never handed out twice
+        rows = self.db.execute(
+            "SELECT job_id, spec FROM jobs WHERE status = 'queued' ORDER BY rowid LIMIT ?", (count,)
+        ).fetchall()
+        now = time.time()
+        self.db.executemany(
+            "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, updated = ? WHERE job_id = ?",
+            [(worker_id, now, job_id) for job_id, _ in rows],
+        )
+        self.db.execute("UPDATE workers SET heartbeat = ? WHERE worker_id = ?", (now, worker_id))
+        self.db.execute("COMMIT")
+        return [JobSpec.from_dict(json.loads(spec)) for _, spec in rows]
+
+    def finish(self, worker_id, results):
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        for result in results:
+            if "error" in result:
+                self.db.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated = ?"
+                    " WHERE job_id = ? AND worker = ? AND status = 'running'",
+                    (result["error"], now, result["job_id"], worker_id),
+                )
+            else:
+                # only if still ours, a job re-queued meanwhile belongs to someone else now
+                self.db.execute(
+                    "UPDATE jobs SET status = 'done', result = ?, error = NULL, updated = ?"
+                    " WHERE job_id = ? AND worker = ? AND status = 'running'",
+                    (pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), now, result["job_id"], worker_id),
+                )
+        self.db.execute("UPDATE workers SET jobs_done = jobs_done + ?, heartbeat = ? WHERE worker_id = ?",
+                        (len(results), now, worker_id))
+        self.db.execute("COMMIT")
+
+
+class QueueWorker:
+    """
+    Pulls `batch` jobs at a time from the queue and runs them in this process.
+    Datasets and indicators are loaded once per process and reused for every job.
+    """
+    def __init__(self, queue_path, batch=4, heartbeat_every=5.0, idle_exit=None, exit_on_close=True):
+        self.queue_path = queue_path
+        self.batch = batch
+        self.heartbeat_every = heartbeat_every
+        self.idle_exit = idle_exit  # seconds without work before giving up, None = no limit
+        # a closed queue ends the worker; with exit_on_close=False only after it worked on a
+        # sweep, so workers can be started on the other hosts before the coordinator
+        self.exit_on_close = exit_on_close
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._stop = threading.Event()
+
+    def _beat(self):
+        queue = JobQueue(self.queue_path)  # own connection, sqlite objects stay in their thread
+        while not self._stop.wait(self.heartbeat_every):
+            queue.heartbeat(self.worker_id)
+
+    def run(self):
+        from Runner.worker import prepare_local, run_job_safely
+
+        queue = JobQueue(self.queue_path)
+        queue.register(self.worker_id)
+        beat = threading.Thread(target=self._beat, daemon=True)
+        beat.start()
+        idle_since = time.time()
+        done = 0
+        try:
+            while True:
+                jobs = queue.claim(self.worker_id, self.batch)
+                if not jobs:
+                    closed = queue.is_closed() and (self.exit_on_close or done)
+                    if closed or (self.idle_exit and time.time() - idle_since > self.idle_exit):
+                        break
+                    time.sleep(0.5)
+                    continue
+                prepare_local(jobs)
+                queue.finish(self.worker_id, [run_job_safely(spec) for spec in jobs])
+                done += len(jobs)
+                idle_since = time.time()
+        finally:
+            self._stop.set()
+        return done
+
+
+def _worker_main(queue_path, batch, heartbeat_every, idle_exit, exit_on_close):
+    QueueWorker(queue_path, batch, heartbeat_every, idle_exit, exit_on_close).run()
+
+
+def start_workers(queue_path, count, batch=4, heartbeat_every=5.0, idle_exit=None, exit_on_close=True):
+    """Starts `count` worker processes on this host, returns the Process objects."""
+    procs = []
+    for _ in range(count):
+        proc = Process(target=_worker_main,
+                       args=(str(queue_path), batch, heartbeat_every, idle_exit, exit_on_close))
+        proc.start()
+        procs.append(proc)
+    return procs
+
+
+def run_distributed(jobs, sink, queue_path=DEFAULT_QUEUE, local_workers=0, batch=4,
+                    heartbeat_timeout=30.0, max_attempts=3, cache=None, progress=True, poll=1.0):
+    """
+    Coordinator: same contract as run_streaming (results to `sink`, returns how many),
+    but the jobs are executed by whatever QueueWorkers attach to `queue_path`.
+    local_workers > 0 also starts that many on this host.
+    """
+    from Runner.batch_runner import Progress, lookup_cache, report_failures
+    from Runner.worker import safe_strategy_id
+
+    hits, pending = lookup_cache(jobs, cache)
+    specs = {spec.job_id: spec for spec in pending}
+    queue = JobQueue(queue_path)
+    queue.reset(pending)
+    procs = start_workers(queue_path, local_workers, batch, heartbeat_timeout / 3) if pending else []
+    tracker = Progress(len(pending), every=max(1, len(pending) // 20)) if progress and pending else None
+    delivered = 0
+
+    try:
+        for result in hits:
+            sink.handle(result)
+            delivered += 1
+
+        remaining = len(pending)
+        while remaining:
+            time.sleep(poll)
+            for result in queue.take_results():
+                if cache is not None:
+                    cache.put(specs[result["job_id"]], result)
+                sink.handle(result)
+                delivered += 1
+                remaining -= 1
+                if tracker:
+                    tracker.update()
+
+            dead, requeued = queue.requeue_dead(heartbeat_timeout, max_attempts)
+            if dead:
+                print(f"Workers lost: {', '.join(dead)}, {requeued} jobs re-queued")
+            queue.retry_failed(max_attempts)
+            counts = queue.counts()
+            failed = counts.get("failed", 0)
+            if failed and failed == remaining and not counts.get("queued") and not counts.get("running"):
+                break  # only jobs that ran out of attempts are left
+    finally:
+        queue.close_queue()
+        sink.close()
+        for proc in procs:
+            proc.join()
+        if cache is not None:
+            cache.evict()
+        report_failures({job_id: (safe_strategy_id(specs[job_id]), error or "") for job_id, _, error in queue.failures()})
+    return delivered
+
+
+def distributed_from_config(config):
+    settings = config.get("distributed") or {}
+    return settings if settings.get("enabled", False) else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker processes for a distributed sweep")
+    parser.add_argument("role", choices=["worker"])
+    parser.add_argument("--queue", default=DEFAULT_QUEUE, help="queue file on storage shared with the coordinator")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="workers to start on this host")
+    parser.add_argument("--batch", type=int, default=4, help="jobs claimed at a time")
+    parser.add_argument("--heartbeat", type=float, default=5.0, help="seconds between heartbeats")
+    parser.add_argument("--idle-exit", type=float, help="exit after this many seconds without work")
+    args = parser.parse_args()
+
+    print(f"Starting {args.processes} workers on {socket.gethostname()} for {args.queue}")
+    for proc in start_workers(args.queue, args.processes, args.batch, args.heartbeat, args.idle_exit,
+                              exit_on_close=False):
+        proc.join()
@@ -0,0 +1,22 @@
+from Strategies.indicators import compute_indicators
+
+# In a sweep most indicators (EMA, ATR, RSI, ATR average) are identical for every
+# (short, long) pair and the SMAs only come in a handful of distinct windows.
+# The plan is the union of what every job needs, so each indicator is computed once.
+
+def plan_indicators(jobs):
+    #dataset (data_path, data_filter) -> {indicator name: spec} for the vectorized jobs of the sweep
+    plan={}
+    for spec in jobs:
+        if spec.backend!="vectorized":
+            continue
+        try:
+            strategy=spec.build_strategy()
+        except Exception:
+            continue #a broken spec fails (and is reported) in its worker, not here
+        if hasattr(strategy,"required_indicators"):
+            plan.setdefault(spec.dataset,{}).update(strategy.required_indicators())
+    return plan
+
+def build_indicator_cache(columns,specs):
+    return compute_indicators(columns,specs)
@@ -1,27 +1,49 @@
-from Engine.data_loader import DataLoader
-from Engine.execution import ExecutionEngine
-from Engine.portfolio import Portfolio
-from Engine.metrics import Metrics
-from Strategies.ma_crossover import MACrossoverStrategy
+from Engine.candle_cache import DEFAULT_CANDLE_DIR
+from Engine.data_loader import data_filters
+from Runner.job_spec import JobSpec
+from Runner.strategy_factory import check_params
 
-def build_jobs(config,strategy_params): #config->YAML se aaya hua pura exp plan and strategy params means the pairs generated for lwindow,swindow
+def build_jobs(config,strategy_params,data_range=None): #config->YAML se aaya hua pura exp plan and strategy params means the pairs generated for lwindow,swindow
+    #only lightweight JobSpecs are built here, workers create the strategy/portfolio objects themselves
+    #strategy_params items are (short,long) pairs or full param dicts (optimizer), data_range=(start,stop) bars
     jobs=[]
     ema_period=config["strategies"]["ma_crossover"].get("ema_period",200)
-    for short,long in strategy_params:
-        strategy=MACrossoverStrategy(short,long,ema_period=ema_period)
-        execution=ExecutionEngine(
-            config["execution"]["commission"],
-            config["execution"]["slippage"]
-        )
-        metrics = Metrics(config["portfolio"]["capital"])
-        portfolio = Portfolio(config["portfolio"]["capital"], metrics)
-        jobs.append((
-            config["data"]["path"], #only path is passed
+    engine_config=config.get("engine",{})
+    backend=engine_config.get("backend","event") #event->candle loop, vectorized->numpy arrays, streaming->candle loop over batches
+    feed={"candle_cache":config["data"].get("candle_cache",DEFAULT_CANDLE_DIR)} #memory mapped .npy copy of the data, null=off
+    if backend=="streaming": #reads its data in batches instead
+        feed={"batch_size":engine_config.get("stream_batch_size",100000),"prefetch":engine_config.get("prefetch",2)}
+    execution={
+        "commission":config["execution"]["commission"],
+        "slippage":config["execution"]["slippage"]
+    }
+    portfolio={"capital":config["portfolio"]["capital"]}
+    results_config=config.get("results",{})
+    metrics={ #how much of the equity curve travels back from the workers
+        "equity_resolution":results_config.get("equity_resolution","full"),
+        "equity_points":results_config.get("equity_points",1000),
+        "periods_per_year":results_config.get("periods_per_year") #annualises sharpe/sortino/calmar
+    }
+    stop=config.get("stop_rules") or {} #early termination thresholds, see Engine.stop_rules
+    data_filter=data_filters(config["data"]) #time range/symbols/columns pushed down into the parquet read
+    for item in strategy_params:
+        if isinstance(item,dict):
+            params=dict(item)
+        else:
+            short,long=item
+            params={"short_window":short,"long_window":long,"ema_period":ema_period}
+        check_params("ma_crossover",params)
+        jobs.append(JobSpec.create(
+            "ma_crossover",
+            params,
             execution,
-            strategy,
             portfolio,
+            config["data"]["path"], #only path is passed
+            backend,
             metrics,
-            short,
-            long
+            stop,
+            data_range,
+            data_filter,
+            feed
         ))
-    return jobs
\ No newline at end of file
+    return jobs
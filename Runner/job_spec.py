@@ -0,0 +1,117 @@
+import hashlib
+import json
+from dataclasses import dataclass
+
+from Engine.execution import ExecutionEngine
+from Engine.portfolio import Portfolio
+from Engine.metrics import Metrics
+from Engine.stop_rules import StopRules
+from Runner.strategy_factory import create_strategy, strategy_id
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    """
+    Declarative description of one backtest: which strategy with which params,
+    the execution/portfolio settings and a reference to the data. It is a few
+    hundred bytes to pickle, hashable (dedupe / cache key) and loggable as JSON;
+    workers turn it into live objects with build().
+    Dict settings are stored as tuples of (key, value) pairs to keep it immutable.
+    """
+    strategy: str
+    params: tuple
+    execution: tuple
+    portfolio: tuple
+    data_path: str
+    backend: str = "event"
+    metrics: tuple = ()  # Metrics options, e.g. equity_resolution / equity_points
+    stop: tuple = ()  # StopRules thresholds, empty = always run to the end
+    data_range: tuple = ()  # (start, stop) bar slice of the dataset, empty = all of it
+    data_filter: tuple = ()  # DataLoader pushdown: start / end / symbols / columns, empty = whole file
+    feed: tuple = ()  # how the worker reads the data: candle_cache dir, or batch_size / prefetch for streaming
+
+    @classmethod
+    def create(cls, strategy, params, execution, portfolio, data_path, backend="event", metrics=None, stop=None,
+               data_range=None, data_filter=None, feed=None):
+        return cls(
+            strategy=strategy,
+            params=tuple(params.items()),
+            execution=tuple(execution.items()),
+            portfolio=tuple(portfolio.items()),
+            data_path=str(data_path),
+            backend=backend,
+            metrics=tuple((metrics or {}).items()),
+            stop=tuple((stop or {}).items()),
+            data_range=tuple(data_range or ()),
+            data_filter=tuple((k, _freeze(v)) for k, v in (data_filter or {}).items() if v is not None),
+            feed=tuple((feed or {}).items()),
+        )
+
+    @property
+    def params_dict(self):
+        return dict(self.params)
+
+    @property
+    def dataset(self):
+        # what the data is keyed by in workers, shared memory and the indicator plan
+        return (self.data_path, self.data_filter)
+
+    @property
+    def strategy_id(self):
+        return strategy_id(self.strategy, self.params_dict)
+
+    @property
+    def job_id(self):
+        # stable across runs and processes, unlike hash()
+        return hashlib.sha1(self.to_json().encode()).hexdigest()[:16]
+
+    def to_dict(self):
+        return {
+            "strategy": self.strategy,
+            "params": dict(self.params),
+            "execution": dict(self.execution),
+            "portfolio": dict(self.portfolio),
+            "data_path": self.data_path,
+            "backend": self.backend,
+            "metrics": dict(self.metrics),
+            "stop": dict(self.stop),
+            "data_range": list(self.data_range),
+            "data_filter": {k: list(v) if isinstance(v, tuple) else v for k, v in self.data_filter},
+            "feed": dict(self.feed),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls.create(d["strategy"], d["params"], d["execution"], d["portfolio"],
+                          d["data_path"], d.get("backend", "event"), d.get("metrics"), d.get("stop"),
+                          d.get("data_range"), d.get("data_filter"), d.get("feed"))
+
+    def build_strategy(self):
+        return create_strategy(self.strategy, self.params_dict)
+
+    def build(self):
+        """Returns fresh (strategy, execution, portfolio, metrics) for this job."""
+        execution = dict(self.execution)
+        capital = dict(self.portfolio)["capital"]
+        metrics = Metrics(capital, **dict(self.metrics))
+        return (
+            self.build_strategy(),
+            ExecutionEngine(execution["commission"], execution["slippage"]),
+            Portfolio(capital, metrics),
+            metrics,
+        )
+
+    def build_stop_rules(self):
+        return StopRules.from_dict(self.stop)  # None when no rule is set
+
+
+def _freeze(value):
+    # lists -> tuples to stay hashable, YAML dates -> ISO strings to stay JSON friendly
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
@@ -0,0 +1,96 @@
+import pickle
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_MANIFEST = "results/manifest.sqlite"
+
+
+class JobManifest:
+    """
+    Durable record of a sweep in SQLite, one row per job_id:
+    status (pending / done / failed), attempts, last error and the pickled result.
+    A row is committed as soon as its job finishes, so a crash or preemption
+    only loses the jobs that were running; a resumed sweep re-delivers the
+    done results and runs the rest.
+    """
+    def __init__(self, path=DEFAULT_MANIFEST):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")  # cheap commits, readers never block the writer
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, spec TEXT, status TEXT, attempts INTEGER DEFAULT 0,"
+            " error TEXT, result BLOB, updated REAL)"
+        )
+        self.db.commit()
+
+    def reset(self):
+        # a fresh (not resumed) sweep starts from an empty manifest
+        self.db.execute("DELETE FROM jobs")
+        self.db.commit()
+        return self
+
+    def register(self, jobs):
+        now = time.time()
+        self.db.executemany(
+            "INSERT OR IGNORE INTO jobs (job_id, spec, status, updated) VALUES (?, ?, 'pending', ?)",
+            [(spec.job_id, spec.to_json(), now) for spec in jobs],
+        )
+        self.db.commit()
+
+    def split(self, jobs):
+        """Returns (results of finished jobs, jobs still to run) for this job list."""
+        done = {
+            job_id: blob for job_id, blob in
+            self.db.execute("SELECT job_id, result FROM jobs WHERE status = 'done'")
+        }
+        finished = []
+        pending = []
+        for spec in jobs:
+            if spec.job_id in done:
+                finished.append(pickle.loads(done[spec.job_id]))
+            else:
+                pending.append(spec)
+        return finished, pending
+
+    def mark_done(self, job_id, result):
+        self.db.execute(
+            "UPDATE jobs SET status = 'done', attempts = attempts + 1, error = NULL, result = ?, updated = ?"
+            " WHERE job_id = ?",
+            (pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), time.time(), job_id),
+        )
+        self.db.commit()
+
+    def mark_failed(self, job_id, error):
+        self.db.execute(
+            "UPDATE jobs SET status = 'failed', attempts = attempts + 1, error = ?, updated = ? WHERE job_id = ?",
+            (error, time.time(), job_id),
+        )
+        self.db.commit()
+
+    def attempts(self, job_id):
+        row = self.db.execute("SELECT attempts FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else 0
+
+    def failures(self):
+        # [(job_id, attempts, error)] for the failure report
+        return self.db.execute(
+            "SELECT job_id, attempts, error FROM jobs WHERE status = 'failed' ORDER BY job_id"
+        ).fetchall()
+
+    def counts(self):
+        return dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        self.db.close()
+
+
+def manifest_from_config(config, resume=False):
+    checkpoint = config.get("checkpoint") or {}
+    if not checkpoint.get("enabled", False):
+        return None
+    manifest = JobManifest(checkpoint.get("path", DEFAULT_MANIFEST))
+    return manifest if resume else manifest.reset()
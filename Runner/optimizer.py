@@ -0,0 +1,198 @@
+import math
+
+import numpy as np
+
+from Engine.data_loader import count_config_rows
+from Runner.batch_runner import WorkerPool, run_streaming
+from Runner.job_builder import build_jobs
+from Runner.result_cache import cache_from_config
+from Runner.strategy_factory import expand_space
+from reporting.sinks import CollectSink
+
+# Parameter search on top of the parallel runner, selected with optimizer.mode:
+#   grid     every combination (what main.py does without an optimizer)
+#   halving  successive halving: all candidates on a short prefix of the data,
+#            the top 1/eta promoted to an eta times longer prefix, ... up to the full data
+#   random   `budget` random combinations
+#   model    sequential model based search: random start, then batches picked by a
+#            TPE style score (how often each param value shows up in the best results)
+
+
+def search_space(config):
+    opt_config = config.get("optimizer") or {}
+    return opt_config.get("space") or config["strategies"]["ma_crossover"]
+
+
+def dataset_length(config):
+    return count_config_rows(config)
+
+
+class Optimizer:
+    def __init__(self, config, sink=None):
+        opt_config = config.get("optimizer") or {}
+        self.config = config
+        self.sink = sink  # full data results are handed to it, like run_streaming does
+        self.mode = opt_config.get("mode", "grid")
+        self.metric = opt_config.get("metric", "total_pnl")
+        self.maximize = opt_config.get("maximize", True)
+        self.budget = opt_config.get("budget", 64)
+        self.eta = opt_config.get("eta", 3)
+        self.min_fraction = opt_config.get("min_fraction", 0.125)
+        if self.eta <= 1:
+            raise ValueError(f"optimizer.eta must be > 1, got {self.eta}")
+        if self.min_fraction <= 0:
+            raise ValueError(f"optimizer.min_fraction must be > 0, got {self.min_fraction}")
+        self.max_candidates = opt_config.get("max_candidates")
+        self.gamma = opt_config.get("gamma", 0.25)
+        self.rng = np.random.default_rng(opt_config.get("seed", 42))
+        self.space = search_space(config)
+        self.grid = expand_space("ma_crossover", self.space)
+        self.cache = cache_from_config(config)
+        self.results = []  # every full data result, in evaluation order
+        self.evaluated = 0  # jobs run (or read from the cache), prefixes included
+        self.pool = None  # workers + shared data of the whole search, see run()
+
+    # running
+
+    def evaluate(self, candidates, data_range=None, progress=True):
+        parallel = self.config["parallel"]
+        jobs = build_jobs(self.config, candidates, data_range)
+        collect = CollectSink()
+        run_streaming(
+            jobs,
+            workers=parallel["workers"],
+            sink=collect,
+            chunksize=parallel.get("chunksize", 1),
+            group_size=parallel.get("group_size", 1),
+            progress=progress,
+            cache=self.cache,
+            pool=self.pool,
+        )
+        by_id = {result["job_id"]: result for result in collect.results}
+        # same order as candidates, None for a job that failed (run_streaming reported it), it scores -inf
+        results = [by_id.get(spec.job_id) for spec in jobs]
+        failed = results.count(None)
+        if failed:
+            print(f"{failed} of {len(jobs)} candidates failed, ranked last")
+        self.evaluated += len(results)
+        if not data_range:
+            done = [result for result in results if result is not None]
+            self.results.extend(done)
+            if self.sink is not None:
+                for result in done:
+                    self.sink.handle(result)
+        return results
+
+    def score(self, result):
+        if result is None:
+            return -math.inf
+        value = result.get(self.metric)
+        if value is None or math.isnan(value):
+            return -math.inf
+        return value if self.maximize else -value
+
+    def ranked(self, candidates, results):
+        order = sorted(range(len(candidates)), key=lambda i: self.score(results[i]), reverse=True)
+        return [candidates[i] for i in order]
+
+    def sample(self, count):
+        count = min(count, len(self.grid))
+        picks = self.rng.choice(len(self.grid), size=count, replace=False)
+        return [self.grid[i] for i in sorted(picks)]
+
+    # search modes
+
+    def run(self):
+        modes = {
+            "grid": self.grid_search,
+            "halving": self.successive_halving,
+            "random": self.random_search,
+            "model": self.model_search,
+        }
+        if self.mode not in modes:
+            raise ValueError(f"Unknown optimizer mode: {self.mode}")
+        # one pool for every rung / batch: the data and the indicators of the whole grid
+        # are published once, not once per evaluate()
+        self.pool = WorkerPool(build_jobs(self.config, self.grid), self.config["parallel"]["workers"],
+                               self.config.get("profiling"))
+        try:
+            modes[self.mode]()
+        finally:
+            self.pool.close()
+            self.pool.profiler.finish()
+            self.pool = None
+            if self.sink is not None:
+                self.sink.close()
+        return self.results
+
+    def grid_search(self):
+        self.evaluate(self.grid)
+
+    def random_search(self):
+        self.evaluate(self.sample(self.budget))
+
+    def successive_halving(self):
+        candidates = self.sample(self.max_candidates) if self.max_candidates else list(self.grid)
+        n = dataset_length(self.config)
+        fraction = self.min_fraction
+        while True:
+            stop_bar = int(n * fraction)
+            if stop_bar >= n:
+                self.evaluate(candidates)
+                return
+            print(f"Rung: {len(candidates)} candidates on the first {stop_bar} bars")
+            results = self.evaluate(candidates, (0, stop_bar))
+            keep = max(1, math.ceil(len(candidates) / self.eta))
+            candidates = self.ranked(candidates, results)[:keep]
+            fraction *= self.eta
+
+    def model_search(self):
+        keys = list(self.space)
+        values = {k: v if isinstance(v, list) else [v] for k, v in self.space.items()}
+        # grid as a (candidates x params) matrix of value indices
+        codes = np.array([[values[k].index(params[k]) for k in keys] for params in self.grid])
+        tried = np.zeros(len(self.grid), dtype=bool)
+        scores = np.full(len(self.grid), -np.inf)
+
+        budget = min(self.budget, len(self.grid))
+        batch = max(1, self.config["parallel"]["workers"])
+        start = max(batch, budget // 4)
+
+        picks = self.rng.choice(len(self.grid), size=min(start, budget), replace=False)
+        while True:
+            results = self.evaluate([self.grid[i] for i in picks], progress=False)
+            tried[picks] = True
+            scores[picks] = [self.score(r) for r in results]
+            done = int(tried.sum())
+            if done >= budget:
+                return
+            print(f"Model search: {done}/{budget}, best {self.metric} so far {np.max(scores):.4f}")
+
+            # good = top gamma of what was tried; each value scores log((good+1)/(bad+1)),
+            # normalised by how many times it was tried, summed over the params
+            order = np.flatnonzero(tried)[np.argsort(-scores[tried], kind="stable")]
+            n_good = max(1, int(math.ceil(self.gamma * len(order))))
+            good, bad = order[:n_good], order[n_good:]
+            total = np.zeros(len(self.grid))
+            for j, k in enumerate(keys):
+                size = len(values[k])
+                good_counts = np.bincount(codes[good, j], minlength=size) + 1.0
+                bad_counts = np.bincount(codes[bad, j], minlength=size) + 1.0
+                ratio = np.log(good_counts / good_counts.sum()) - np.log(bad_counts / bad_counts.sum())
+                total += ratio[codes[:, j]]
+            total += self.rng.random(len(self.grid)) * 1e-6  # random tie break
+            total[tried] = -np.inf
+            picks = np.argsort(-total, kind="stable")[:min(batch, budget - done)]
+
+    # reporting
+
+    def best(self, n=1):
+        ranked = sorted(self.results, key=self.score, reverse=True)
+        return ranked[:n]
+
+
+def optimize(config, sink=None):
+    """Runs the configured search, returns the Optimizer (results, best(), evaluated)."""
+    optimizer = Optimizer(config, sink)
+    optimizer.run()
+    return optimizer
@@ -0,0 +1,238 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+
+from Runner.strategy_factory import STRATEGIES
+
+# Bump whenever a change can change results or the result fields,
+# every entry written by an older version then stops matching.
+# 3: terminated / termination_reason / terminated_bar (stop rules), optimizer param dicts
+ENGINE_VERSION = "3"
+
+# The key also holds a hash of the code that produces results, so an engine or strategy
+# change that forgot the bump above still misses instead of serving stale entries.
+# Folders or single files; from Runner only what decides how a job runs (engine, strategy
+# class and params, indicators, stop rules), not the scheduling around it.
+RESULT_CODE = (
+    "Engine",
+    "Strategies",
+    "Runner/worker.py",
+    "Runner/job_spec.py",
+    "Runner/strategy_factory.py",
+    "Runner/indicator_cache.py",
+)
+
+DEFAULT_CACHE_DIR = "cache/results"
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+_code_fingerprint = []
+
+
+def code_fingerprint():
+    """sha256 of every .py file in RESULT_CODE, computed once per process."""
+    if not _code_fingerprint:
+        root = Path(__file__).resolve().parent.parent
+        digest = hashlib.sha256()
+        for entry in RESULT_CODE:
+            path = root / entry
+            files = sorted(path.rglob("*.py")) if path.is_dir() else [path]
+            for file in files:
+                digest.update(file.relative_to(root).as_posix().encode())
+                digest.update(file.read_bytes())
+        _code_fingerprint.append(digest.hexdigest())
+    return _code_fingerprint[0]
+
+
+class ResultCache:
+    """
+    Persistent on-disk cache of backtest results keyed by content:
+    dataset bytes + strategy class + params + execution/portfolio settings + ENGINE_VERSION
+    + a hash of the engine/strategy source.
+    The backend is left out of the key on purpose, event and vectorized give identical results.
+    Entries are pickles under <path>/<key[:2]>/<key>.pkl; a hit refreshes the mtime,
+    so eviction by size/count drops least recently used entries first.
+    """
+    def __init__(self, path=DEFAULT_CACHE_DIR, max_entries=None, max_bytes=None, max_age_days=None):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._fingerprints = {}
+        self.hits = 0
+        self.misses = 0
+
+    # keys
+
+    def dataset_fingerprint(self, data_path):
+        """
+        sha256 of the dataset contents (every file, for a partitioned directory).
+        Digests are remembered in fingerprints.json by (size, mtime) so an unchanged
+        file is only hashed once.
+        """
+        if data_path in self._fingerprints:
+            return self._fingerprints[data_path]
+
+        root = Path(data_path)
+        files = sorted(p for p in root.rglob("*") if p.is_file()) if root.is_dir() else [root]
+
+        index_file = self.path / "fingerprints.json"
+        index = json.loads(index_file.read_text()) if index_file.exists() else {}
+
+        digest = hashlib.sha256()
+        for file in files:
+            stat = file.stat()
+            stamp = f"{stat.st_size}:{stat.st_mtime_ns}"
+            entry = index.get(str(file.resolve()))
+            if not entry or entry["stamp"] != stamp:
+                entry = {"stamp": stamp, "sha256": _file_digest(file)}
+                index[str(file.resolve())] = entry
+            digest.update(file.relative_to(root).as_posix().encode() if root.is_dir() else b"")
+            digest.update(entry["sha256"].encode())
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        index_file.write_text(json.dumps(index))
+        self._fingerprints[data_path] = digest.hexdigest()
+        return self._fingerprints[data_path]
+
+    def key(self, spec):
+        strategy_cls = STRATEGIES[spec.strategy]
+        payload = {
+            "data": self.dataset_fingerprint(spec.data_path),
+            "strategy": f"{strategy_cls.__module__}.{strategy_cls.__qualname__}",
+            "params": spec.params_dict,
+            "execution": dict(spec.execution),
+            "portfolio": dict(spec.portfolio),
+            "metrics": dict(spec.metrics),
+            "stop": dict(spec.stop),
+            "data_range": list(spec.data_range),
+            "data_filter": spec.to_dict()["data_filter"],
+            "engine_version": ENGINE_VERSION,
+            "code": code_fingerprint(),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def _entry(self, key):
+        return self.path / key[:2] / f"{key}.pkl"
+
+    # lookups
+
+    def get(self, spec):
+        entry = self._entry(self.key(spec))
+        try:
+            with open(entry, "rb") as f:
+                result = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        if self._expired(entry.stat().st_mtime):
+            self.misses += 1
+            return None
+        os.utime(entry)
+        self.hits += 1
+        return result
+
+    def put(self, spec, result):
+        entry = self._entry(self.key(spec))
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = entry.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, entry)  # atomic, readers never see half an entry
+
+    def split(self, jobs):
+        """Returns (cached results, jobs still to run)."""
+        cached = []
+        pending = []
+        for spec in jobs:
+            result = self.get(spec)
+            if result is None:
+                pending.append(spec)
+            else:
+                cached.append(result)
+        return cached, pending
+
+    # maintenance
+
+    def _expired(self, mtime):
+        return self.max_age_days is not None and time.time() - mtime > self.max_age_days * 86400
+
+    def entries(self):
+        return list(self.path.glob("*/*.pkl")) if self.path.exists() else []
+
+    def evict(self):
+        """Drops expired entries, then the least recently used ones until under the limits."""
+        removed = 0
+        stats = []
+        for entry in self.entries():
+            stat = entry.stat()
+            if self._expired(stat.st_mtime):
+                entry.unlink(missing_ok=True)
+                removed += 1
+            else:
+                stats.append((stat.st_mtime, stat.st_size, entry))
+
+        stats.sort()  # oldest first
+        total = sum(size for _, size, _ in stats)
+        while stats and (
+            (self.max_entries is not None and len(stats) > self.max_entries)
+            or (self.max_bytes is not None and total > self.max_bytes)
+        ):
+            _, size, entry = stats.pop(0)
+            entry.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        removed = 0
+        for entry in self.entries():
+            entry.unlink(missing_ok=True)
+            removed += 1
+        (self.path / "fingerprints.json").unlink(missing_ok=True)
+        self._fingerprints.clear()
+        return removed
+
+
+def cache_from_config(config):
+    cache_config = config.get("cache") or {}
+    if not cache_config.get("enabled", False):
+        return None
+    max_mb = cache_config.get("max_size_mb")
+    return ResultCache(
+        path=cache_config.get("path", DEFAULT_CACHE_DIR),
+        max_entries=cache_config.get("max_entries"),
+        max_bytes=max_mb * 1024 * 1024 if max_mb else None,
+        max_age_days=cache_config.get("max_age_days"),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the backtest result cache")
+    parser.add_argument("--config", default="config/experiment.yaml")
+    parser.add_argument("--clear", action="store_true", help="invalidate every cached result")
+    parser.add_argument("--evict", action="store_true", help="apply the age/size limits now")
+    args = parser.parse_args()
+
+    from Runner.config_loader import load_config
+
+    config = load_config(args.config)
+    cache = cache_from_config(config) or ResultCache((config.get("cache") or {}).get("path", DEFAULT_CACHE_DIR))
+    if args.clear:
+        print("Removed", cache.clear(), "cached results")
+    elif args.evict:
+        print("Evicted", cache.evict(), "cached results")
+    else:
+        entries = cache.entries()
+        print(f"{len(entries)} cached results, {sum(e.stat().st_size for e in entries) / 1e6:.1f} MB in {cache.path}")
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import copy
+import json
+import threading
+import time
+from multiprocessing import Pool, resource_tracker
+
+from Engine.metrics import decode_curve
+from Engine.shared_data import SharedColumns
+from Runner.batch_runner import lookup_cache
+from Runner.config_loader import load_config
+from Runner.indicator_cache import plan_indicators
+from Runner.job_builder import build_jobs
+from Runner.job_spec import JobSpec
+from Runner.result_cache import cache_from_config
+from Runner.strategy_factory import check_params, generate_strategies
+from Runner.worker import error_result, load_columns, run_attached
+from Strategies.indicators import compute_indicators
+
+# Resident backtest daemon: imports, the worker Pool and the datasets (in shared memory,
+# with every indicator computed so far) stay warm between requests, so a rerun only
+# pays for the backtests themselves.
+# Protocol: newline delimited JSON over TCP on localhost, one request per line:
+#   {"op": "ping"} / {"op": "status"} / {"op": "shutdown"}
+#   {"op": "sweep", "config": {...overrides...}, "params": [{...}, ...], "equity": false}
+# A sweep answers with one {"type": "result", ...} line per job as it finishes (or
+# {"type": "error", "job_id": ...} for a job that failed), then {"type": "done", ...}.
+# A request that fails as a whole (bad override, unknown op, ...) is answered with one
+# {"type": "error", "error": ...} without a job_id, which ends it like "done" does.
+# See tools/backtest_client.py.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def merge_config(base, overrides):
+    merged = copy.deepcopy(base)
+    for key, value in (overrides or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def public_result(result, equity=False):
+    # results go out as JSON: the encoded equity payload is dropped or decoded to a list
+    out = {k: v for k, v in result.items() if k != "equity_curve"}
+    if equity:
+        out["equity_curve"] = decode_curve(result.get("equity_curve")).tolist()
+    return out
+
+
+def _label(dataset):
+    # JSON friendly name for status: the path, plus the filters if any
+    data_path, data_filter = dataset
+    return data_path + "".join(f" {k}={v}" for k, v in data_filter)
+
+
+class DatasetRegistry:
+    """
+    Datasets published to shared memory once and kept for the life of the service.
+    The indicator block of a dataset grows with what the sweeps ask for. Every sweep holds
+    a reference on the indicator blocks its jobs use (publish, then release once its
+    results are in); a block replaced by a bigger one is closed when its last sweep releases it.
+    """
+    def __init__(self):
+        self.datasets = {}  # dataset (data_path, data_filter) -> {"data", "indicators", "indicator_block"}
+        self.refs = {}  # indicator block -> sweeps still using it
+        self.retired = []  # replaced blocks waiting for their sweeps
+        self.lock = threading.Lock()
+
+    def publish(self, jobs):
+        """
+        (dataset -> (handle, indicator handle or None), indicator blocks) for these jobs;
+        the blocks are referenced until release(blocks).
+        """
+        with self.lock:
+            plan = plan_indicators(jobs)
+            handles = {}
+            blocks = []
+            datasets = {}
+            for spec in jobs:
+                if spec.backend != "streaming":
+                    datasets.setdefault(spec.dataset, spec)
+            for dataset, spec in datasets.items():
+                entry = self.datasets.get(dataset)
+                if entry is None:
+                    block = SharedColumns(load_columns(spec))
+                    entry = {"data": block, "columns": block.views(),  # views on the block, no second copy
+                             "indicators": {}, "indicator_block": None}
+                    self.datasets[dataset] = entry
+                wanted = plan.get(dataset, {})
+                if any(name not in entry["indicators"] for name in wanted):
+                    compute_indicators(entry["columns"], wanted, entry["indicators"])
+                    old = entry["indicator_block"]
+                    entry["indicator_block"] = SharedColumns(entry["indicators"])
+                    if old is not None:
+                        self._retire(old)
+                block = entry["indicator_block"]
+                if block is not None:
+                    self.refs[block] = self.refs.get(block, 0) + 1
+                    blocks.append(block)
+                handles[dataset] = (entry["data"].handle, block.handle if block is not None else None)
+            return handles, blocks
+
+    def release(self, blocks):
+        with self.lock:
+            for block in blocks:
+                self.refs[block] -= 1
+                if not self.refs[block]:
+                    del self.refs[block]
+                    if block in self.retired:
+                        self.retired.remove(block)
+                        block.close()
+
+    def _retire(self, block):
+        if block in self.refs:
+            self.retired.append(block)  # a sweep still runs on it
+        else:
+            block.close()
+
+    def status(self):
+        return {
+            _label(dataset): {"bars": len(next(iter(entry["columns"].values()))),
+                              "indicators": len(entry["indicators"])}
+            for dataset, entry in self.datasets.items()
+        }
+
+    def close(self):
+        for entry in self.datasets.values():
+            entry["columns"] = None
+            entry["data"].close()
+            if entry["indicator_block"] is not None:
+                entry["indicator_block"].close()
+        for block in self.retired:
+            block.close()
+        self.datasets.clear()
+        self.retired.clear()
+        self.refs.clear()
+
+
+class BacktestService:
+    def __init__(self, config, workers=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.config = config
+        self.workers = workers or config["parallel"]["workers"]
+        self.host = host
+        self.port = port
+        self.registry = DatasetRegistry()
+        self.cache = cache_from_config(config)  # evicted at shutdown, sweeps use their own merged config's
+        self.pool = None
+        self.server = None
+        self.started = time.time()
+        self.sweeps = 0
+        self.jobs_run = 0
+
+    def warm_up(self):
+        # publish the configured dataset, then fork the pool (every import above is inherited).
+        # The resource tracker has to run before the fork: workers then share the parent's
+        # instead of starting their own, which would unlink the blocks when a worker exits.
+        resource_tracker.ensure_running()
+        _, blocks = self.registry.publish(build_jobs(self.config, generate_strategies(self.config)))
+        self.registry.release(blocks)  # kept published, but not held by a sweep
+        self.pool = Pool(processes=self.workers)
+        print(f"Service warm: {self.workers} workers, datasets {list(self.registry.status())}", flush=True)
+
+    # requests
+
+    async def sweep(self, request, send):
+        start = time.perf_counter()
+        config = merge_config(self.config, request.get("config"))
+        params = request.get("params") or generate_strategies(config)
+        if request.get("jobs"):
+            jobs = [JobSpec.from_dict(job) for job in request["jobs"]]
+            for spec in jobs:
+                check_params(spec.strategy, spec.params_dict)
+        else:
+            jobs = build_jobs(config, params)
+        equity = request.get("equity", False)
+        cache = cache_from_config(config)  # a request can turn the cache off or point it elsewhere
+
+        hits, pending = lookup_cache(jobs, cache)
+        for result in hits:
+            await send({"type": "result", "cached": True, **public_result(result, equity)})
+
+        loop = asyncio.get_running_loop()
+        handles, blocks = await loop.run_in_executor(None, self.registry.publish, pending) if pending else ({}, [])
+        results = asyncio.Queue()
+        specs = {spec.job_id: spec for spec in pending}
+        remaining = [len(pending)]
+
+        def deliver(result):
+            # pool result thread: the blocks are released with the last result, even if the client is gone
+            remaining[0] -= 1
+            if not remaining[0]:
+                self.registry.release(blocks)
+            loop.call_soon_threadsafe(results.put_nowait, result)
+
+        for spec in pending:
+            data_handle, indicator_handle = handles.get(spec.dataset, (None, None))  # streaming: nothing published
+            self.pool.apply_async(
+                run_attached, ((spec, data_handle, indicator_handle),), callback=deliver,
+                error_callback=lambda exc, spec=spec: deliver(error_result(spec, repr(exc))),
+            )
+
+        failed = 0
+        for _ in pending:
+            result = await results.get()
+            if "error" in result:
+                failed += 1
+                await send({"type": "error", "job_id": result["job_id"],
+                            "strategy_id": result["strategy_id"], "error": result["error"]})
+                continue
+            if cache is not None:
+                cache.put(specs[result["job_id"]], result)
+            await send({"type": "result", "cached": False, **public_result(result, equity)})
+
+        self.sweeps += 1
+        self.jobs_run += len(pending)
+        await send({"type": "done", "jobs": len(jobs), "cached": len(hits), "failed": failed,
+                    "seconds": round(time.perf_counter() - start, 4)})
+
+    def status(self):
+        return {"type": "status", "workers": self.workers, "uptime": round(time.time() - self.started, 1),
+                "sweeps": self.sweeps, "jobs_run": self.jobs_run, "datasets": self.registry.status()}
+
+    async def handle_client(self, reader, writer):
+        async def send(message):
+            writer.write((json.dumps(message) + "\n").encode())
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    op = request.get("op")
+                    if op == "ping":
+                        await send({"type": "pong"})
+                    elif op == "status":
+                        await send(self.status())
+                    elif op == "sweep":
+                        await self.sweep(request, send)
+                    elif op == "shutdown":
+                        await send({"type": "bye"})
+                        self.server.close()
+                        break
+                    else:
+                        await send({"type": "error", "error": f"unknown op: {op}"})
+                except Exception as exc:  # a bad request must not take the daemon down
+                    # terminal for the request: no job_id, the client stops waiting for "done"
+                    await send({"type": "error", "error": f"{type(exc).__name__}: {exc}"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port, limit=1 << 24)
+        print(f"Listening on {self.host}:{self.port}", flush=True)
+        try:
+            await self.server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    def run(self):
+        self.warm_up()
+        try:
+            asyncio.run(self.serve())
+        finally:
+            self.pool.terminate()
+            self.registry.close()
+            if self.cache is not None:
+                self.cache.evict()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resident backtest service")
+    parser.add_argument("--config", default="config/experiment.yaml")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    BacktestService(load_config(args.config), args.workers, args.host, args.port).run()
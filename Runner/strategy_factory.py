@@ -1,6 +1,61 @@
+import inspect
 from Strategies.ma_crossover import MACrossoverStrategy
 from itertools import product #Product give each possible combination of {short_window,long_window}
 
+#strategy name used in job specs / YAML -> class, workers build strategies from this
+STRATEGIES={
+    "ma_crossover":MACrossoverStrategy,
+}
+
+def create_strategy(name,params):
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {name}")
+    return STRATEGIES[name](**params)
+
+def default_params(name):
+    signature=inspect.signature(STRATEGIES[name].__init__)
+    return {k:p.default for k,p in signature.parameters.items() if p.default is not inspect.Parameter.empty}
+
+#short tags for the extra ma_crossover params in ids, only non default values show up
+ID_TAGS={"ema_period":"ema","atr_period":"atr","rsi_low":"rsil","rsi_high":"rsih","sl_atr_mult":"sl"}
+
+def check_params(name,params):
+    #rejects a param dict the strategy cannot be built from, before any job is submitted
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {name}")
+    try:
+        inspect.signature(STRATEGIES[name]).bind(**params)
+    except TypeError as exc:
+        raise ValueError(f"Invalid params for {name} {params}: {exc}") from None
+
+def strategy_id(name,params):
+    if name=="ma_crossover":
+        defaults=default_params(name)
+        params={**defaults,**params} #a param left out runs with its default
+        sid=f"ma_{params['short_window']}_{params['long_window']}"
+        for key,tag in ID_TAGS.items():
+            if key in params and params[key]!=defaults.get(key):
+                sid+=f"_{tag}{params[key]}"
+        return sid
+    return name+"_"+"_".join(str(v) for v in params.values())
+
+def valid_params(name,params):
+    if name=="ma_crossover":
+        params={**default_params(name),**params}
+        return params["short_window"]<params["long_window"] and params.get("rsi_low",50)<params.get("rsi_high",75)
+    return True
+
+def expand_space(name,space):
+    #space: param -> list of values (a scalar means fixed), returns every valid combination as a dict
+    keys=list(space)
+    values=[v if isinstance(v,list) else [v] for v in space.values()]
+    grid=[]
+    for combo in product(*values):
+        params=dict(zip(keys,combo))
+        if valid_params(name,params):
+            grid.append(params)
+    return grid
+
 def generate_strategies(config):#input is the config dict and the output is the strategy parameter combinations
     strat_config=config["strategies"]["ma_crossover"]
     shorts=strat_config["short_window"]
@@ -13,4 +68,4 @@ def generate_strategies(config):#input is the config dict and the output is the
             strategies.append((s,l))
     return strategies
 
-#so the all pairs of swindow and lwindows are generated 
\ No newline at end of file
+#so the all pairs of swindow and lwindows are generated 
@@ -0,0 +1,184 @@
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from Engine.data_loader import count_config_rows
+from Engine.metrics import Metrics, decode_bars, decode_curve
+from Runner.batch_runner import run_streaming
+from Runner.job_builder import build_jobs
+from Runner.result_cache import cache_from_config
+from Runner.strategy_factory import generate_strategies
+from reporting.sinks import CollectSink
+
+WALK_FORWARD_DIR = "results/walk_forward"
+
+
+def make_folds(n, train_bars, test_bars, step_bars=None, anchored=False):
+    """
+    [(train_range, test_range)] as (start, stop) bar slices.
+    rolling:  the train window slides by step_bars (default test_bars)
+    anchored: the train window always starts at bar 0 and grows
+    """
+    step_bars = step_bars or test_bars
+    folds = []
+    start = 0
+    while start + train_bars + test_bars <= n:
+        train = (0 if anchored else start, start + train_bars)
+        test = (start + train_bars, start + train_bars + test_bars)
+        folds.append((train, test))
+        start += step_bars
+    return folds
+
+
+class WalkForward:
+    """
+    Out of sample validation: every fold's train window is swept over the grid,
+    the best params by `metric` then run on the fold's test window and the test
+    equity curves are stitched into one out of sample curve.
+    Train jobs of ALL folds go to the pool in one run_streaming call (and the
+    test jobs in a second one), so folds x grid is scheduled as a single queue.
+    The dataset is published to shared memory once; each job only reads its
+    data_range slice of it. Every window is an independent backtest (indicators
+    warm up inside the window, capital starts fresh).
+    """
+    def __init__(self, config):
+        wf_config = config.get("walk_forward") or {}
+        self.config = config
+        self.metric = wf_config.get("metric", "total_pnl")
+        self.maximize = wf_config.get("maximize", True)
+        self.train_bars = wf_config["train_bars"]
+        self.test_bars = wf_config["test_bars"]
+        self.step_bars = wf_config.get("step_bars")
+        self.anchored = wf_config.get("mode", "rolling") == "anchored"
+        self.output = Path(wf_config.get("output", WALK_FORWARD_DIR))
+        self.cache = cache_from_config(config)
+        self.folds = []
+        self.rows = []
+        self.stitched = None
+
+    def _run(self, jobs):
+        parallel = self.config["parallel"]
+        collect = CollectSink()
+        run_streaming(
+            jobs,
+            workers=parallel["workers"],
+            sink=collect,
+            chunksize=parallel.get("chunksize", 1),
+            group_size=parallel.get("group_size", 1),
+            cache=self.cache,
+            profiling=self.config.get("profiling"),
+        )
+        return {result["job_id"]: result for result in collect.results}
+
+    def _score(self, result):
+        value = result.get(self.metric)
+        if value is None or math.isnan(value):
+            return -math.inf
+        return value if self.maximize else -value
+
+    def run(self):
+        n = count_config_rows(self.config)
+        self.folds = make_folds(n, self.train_bars, self.test_bars, self.step_bars, self.anchored)
+        if not self.folds:
+            raise ValueError(f"walk_forward: {n} bars is not enough for one train+test window")
+
+        grid = generate_strategies(self.config)
+        train_jobs = [build_jobs(self.config, grid, train) for train, _ in self.folds]
+        print(f"Walk-forward: {len(self.folds)} folds x {len(grid)} params = "
+              f"{len(self.folds) * len(grid)} train backtests")
+        train_results = self._run([spec for fold_jobs in train_jobs for spec in fold_jobs])
+
+        # best params of each fold, on its own test window; train jobs that failed (run_streaming
+        # reported them) are left out of the pick, a fold with none left is recorded as failed
+        best = []
+        for fold_jobs in train_jobs:
+            done = [(spec, train_results[spec.job_id]) for spec in fold_jobs if spec.job_id in train_results]
+            best.append(max(done, key=lambda pair: self._score(pair[1])) if done else None)
+        test_jobs = [
+            build_jobs(self.config, [pick[0].params_dict], test)[0] if pick else None
+            for pick, (_, test) in zip(best, self.folds)
+        ]
+        test_results = self._run([spec for spec in test_jobs if spec is not None])
+
+        self.rows = []
+        fold_results = []
+        for fold, ((train, test), pick, test_spec) in enumerate(zip(self.folds, best, test_jobs)):
+            test_result = test_results.get(test_spec.job_id) if test_spec is not None else None
+            fold_results.append(test_result)
+            row = {
+                "fold": fold,
+                "train_start": train[0], "train_stop": train[1],
+                "test_start": test[0], "test_stop": test[1],
+                "strategy_id": pick[0].strategy_id if pick else None,
+                f"train_{self.metric}": pick[1].get(self.metric) if pick else None,
+                f"test_{self.metric}": None,
+                "test_pnl": math.nan, "test_trades": 0, "test_max_drawdown": math.nan,
+                "error": None,
+            }
+            if pick is None:
+                row["error"] = "every train job failed"
+            elif test_result is None:
+                row["error"] = "test job failed"
+            else:
+                row.update({
+                    f"test_{self.metric}": test_result.get(self.metric),
+                    "test_pnl": test_result["total_pnl"],
+                    "test_trades": test_result["total_trades"],
+                    "test_max_drawdown": test_result["max_drawdown"],
+                })
+            self.rows.append(row)
+        failed = sum(row["error"] is not None for row in self.rows)
+        if failed:
+            print(f"Walk-forward: {failed} of {len(self.folds)} folds failed, left out of the stitched curve")
+        self.stitched = self.stitch(fold_results)
+        return self
+
+    def stitch(self, test_results):
+        """
+        One out of sample curve: each fold's test curve (which starts from fresh
+        capital) is scaled to continue from where the previous fold ended.
+        """
+        capital = self.config["portfolio"]["capital"]
+        level = 1.0
+        frames = []
+        for fold, ((_, test), result) in enumerate(zip(self.folds, test_results)):
+            if result is None:
+                continue  # failed fold, the next one carries on from the same level
+            curve = decode_curve(result.get("equity_curve"))
+            if not len(curve):
+                continue  # equity_resolution: none, nothing to stitch
+            frames.append(pd.DataFrame({
+                "fold": fold,
+                "bar": test[0] + decode_bars(result["equity_curve"]),
+                "equity": curve * level,
+            }))
+            level *= curve[-1] / capital
+        if not frames:
+            return pd.DataFrame(columns=["fold", "bar", "equity"])
+        return pd.concat(frames, ignore_index=True)
+
+    def out_of_sample_summary(self):
+        # risk stats of the stitched curve, through the same online Metrics as a backtest
+        metrics = Metrics(self.config["portfolio"]["capital"], equity_resolution="none",
+                          periods_per_year=(self.config.get("results") or {}).get("periods_per_year"))
+        metrics.extend_equity(self.stitched["equity"].to_numpy(dtype=np.float64))
+        summary = metrics.risk_summary()
+        for key in ("time_in_market_pct", "profit_factor", "avg_win", "avg_loss"):
+            summary.pop(key)  # trade stats, the stitched curve has no trades
+        ok = [row for row in self.rows if row["error"] is None]
+        summary["folds"] = len(ok)
+        summary["failed_folds"] = len(self.rows) - len(ok)
+        summary["test_pnl_sum"] = float(sum(row["test_pnl"] for row in ok))
+        return summary
+
+    def save(self):
+        self.output.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(self.rows).to_csv(self.output / "folds.csv", index=False)
+        self.stitched.to_parquet(self.output / "oos_equity.parquet", index=False)
+        return self.output
+
+
+def run_walk_forward(config):
+    return WalkForward(config).run()
@@ -1,16 +1,166 @@
-from Engine.data_loader import DataLoader
-from Engine.datafeed import DataFeed
-from Engine.backtesting_engine import BacktestingEngine
-
-def run_single_backtest(args):
-    data_path,execution,strategy,portfolio,metrics,short_w,long_w=args
-    data=DataLoader().load_data(data_path) #Each worker loads it's data khudse
-    feed=DataFeed(data)
-    engine = BacktestingEngine(
-        feed, execution, strategy, portfolio, metrics
-    )
-    engine.run()
+import traceback
+from contextlib import closing, nullcontext
+from Engine.candle_cache import load_candles
+from Engine.datafeed import ArrayDataFeed, StreamingDataFeed
+from Engine.shared_data import attach_columns
+from Engine.backtesting_engine import BacktestingEngine, MultiBacktestingEngine
+from Engine.vectorized_engine import VectorizedBacktestingEngine
+from Engine.instrumentation import StageTimer, WorkerProfiler
+from Runner.indicator_cache import plan_indicators
+from Strategies.indicators import compute_indicators
+
+_shared_data={} #dataset (data_path, data_filter) -> (columns, shm), filled once per worker process by init_shared_data
+_shared_indicators={} #dataset -> (precomputed indicator arrays, shm)
+_profiling={} #worker side profiling settings, see Runner.batch_runner.SweepProfiler
+_profiler=[] #this process's WorkerProfiler, created on first use
+
+def init_shared_data(handles,indicator_handles=None,profiling=None):
+    #Pool initializer: map the datasets the parent already loaded, read only and without copying
+    for dataset,handle in handles.items():
+        _shared_data[dataset]=attach_columns(handle)
+    for dataset,handle in (indicator_handles or {}).items():
+        _shared_indicators[dataset]=attach_columns(handle)
+    _profiling.clear()
+    _profiling.update(profiling or {})
+
+def new_timer():
+    return StageTimer() if _profiling.get("instrument") else None
+
+def profiled():
+    #cProfile around a job when the sweep asked for it, accumulated per worker process
+    if not _profiling.get("profile_dir"):
+        return nullcontext()
+    if not _profiler:
+        _profiler.append(WorkerProfiler(_profiling["profile_dir"]))
+    return _profiler[0]
+
+def candle_dir(spec):
+    return dict(spec.feed).get("candle_cache") #Engine.candle_cache directory, None = decode the source every time
+
+def load_columns(spec):
+    data_path,data_filter=spec.dataset
+    return load_candles(data_path,candle_dir(spec),**dict(data_filter))
+
+def get_columns(spec,data_range=()):
+    if spec.dataset not in _shared_data:
+        #fallback when nothing was published (e.g. a distributed worker): load once per process,
+        #through the candle cache this is a memory map of the .npy columns, shared with every other worker
+        _shared_data[spec.dataset]=(load_columns(spec),None)
+    return slice_columns(_shared_data[spec.dataset][0],data_range)
+
+def prepare_local(jobs):
+    #without a parent publishing shared memory: load each dataset and the indicators these jobs need locally
+    first={}
+    for spec in jobs:
+        first.setdefault(spec.dataset,spec)
+    for dataset,specs in plan_indicators(jobs).items():
+        indicators=_shared_indicators.setdefault(dataset,({},None))[0]
+        compute_indicators(get_columns(first[dataset]),specs,indicators) #only the missing ones are computed
+
+def slice_columns(columns,data_range=()):
+    #bar range of a dataset, numpy slices so the shared memory is not copied
+    if not columns or not data_range:
+        return columns
+    start,stop=data_range
+    return {name:values[start:stop] for name,values in columns.items()}
+
+def make_feed(spec):
+    #streaming jobs read the file batch by batch themselves, nothing of it is published or cached per process
+    if spec.backend=="streaming":
+        return StreamingDataFeed(spec.data_path,data_range=spec.data_range,**dict(spec.feed),**dict(spec.data_filter))
+    return ArrayDataFeed(get_columns(spec,spec.data_range))
+
+def build_result(spec,metrics):
     result=metrics.summary()
-    result["strategy_id"]=f"ma_{short_w}_{long_w}"
-    result["parameters"]={"short_window":short_w,"long_window":long_w}
+    result["strategy_id"]=spec.strategy_id
+    result["parameters"]=spec.params_dict
+    result["job_id"]=spec.job_id
     return result
+
+def run_single_backtest(spec):
+    strategy,execution,portfolio,metrics=spec.build() #objects are created here in the worker, only the spec was pickled
+    timer=new_timer()
+    if spec.backend=="vectorized":
+        columns=get_columns(spec,spec.data_range) #columns as numpy arrays, no per row iloc
+        indicators=_shared_indicators.get(spec.dataset,(None,))[0]
+        if spec.data_range and spec.data_range[0]>0:
+            indicators=None #indicators restart at the slice like in the event engine, a prefix can reuse them
+        indicators=slice_columns(indicators,spec.data_range)
+        engine=VectorizedBacktestingEngine(
+            columns, execution, strategy, portfolio, metrics, indicators, timer, spec.build_stop_rules()
+        )
+        feed=None
+    else:
+        feed=make_feed(spec)
+        engine = BacktestingEngine(
+            feed, execution, strategy, portfolio, metrics, timer, spec.build_stop_rules()
+        )
+    with profiled(),(closing(feed) if feed is not None else nullcontext()):
+        engine.run()
+    result=build_result(spec,metrics)
+    if timer is not None:
+        result["timings"]=timer.summary()
+    return result
+
+def run_backtest_group(group):
+    #a group shares one dataset and data_range; event jobs ride one pass over the candles together
+    event_specs=[spec for spec in group if spec.backend!="vectorized"] #event and streaming
+    results={}
+    if event_specs:
+        feed=make_feed(event_specs[0])
+        runs=[spec.build() for spec in event_specs]
+        timer=new_timer()
+        with profiled(),closing(feed):
+            MultiBacktestingEngine(feed,runs,timer,event_specs[0].build_stop_rules()).run() #one sweep, one set of stop rules
+        for spec,(_,_,_,metrics) in zip(event_specs,runs):
+            results[spec]=build_result(spec,metrics)
+        if timer is not None:
+            results[event_specs[0]]["timings"]=timer.summary() #shared pass, reported once per group
+    for spec in group:
+        if spec not in results:
+            results[spec]=run_single_backtest(spec)
+    return [results[spec] for spec in group] #same order as the group
+
+def safe_strategy_id(spec):
+    #error paths must not fail themselves: params that cannot name the strategy fall back to the job_id
+    try:
+        return spec.strategy_id
+    except Exception:
+        return spec.job_id
+
+def error_result(spec,error):
+    return {"job_id":spec.job_id,"strategy_id":safe_strategy_id(spec),"error":error}
+
+def run_job_safely(spec):
+    #a failing job comes back as an {"error": traceback} result instead of taking the pool down
+    try:
+        return run_single_backtest(spec)
+    except Exception:
+        return error_result(spec,traceback.format_exc())
+
+def run_jobs_safely(specs):
+    #a chunk of independent jobs as one task, each one safe on its own
+    return [run_job_safely(spec) for spec in specs]
+
+def run_group_safely(group):
+    try:
+        return run_backtest_group(group)
+    except Exception:
+        return [run_job_safely(spec) for spec in group] #one by one, so only the broken job fails
+
+def ensure_attached(dataset,handle,indicator_handle=None):
+    #long lived pool (Runner.service): datasets arrive with the task, attach on first use
+    #and again whenever the parent republished a block under a new name
+    current=_shared_data.get(dataset)
+    if current is None or current[1] is None or current[1].name!=handle["name"]:
+        _shared_data[dataset]=attach_columns(handle)
+    if indicator_handle is not None:
+        current=_shared_indicators.get(dataset)
+        if current is None or current[1] is None or current[1].name!=indicator_handle["name"]:
+            _shared_indicators[dataset]=attach_columns(indicator_handle)
+
+def run_attached(task):
+    spec,handle,indicator_handle=task
+    if handle is not None:
+        ensure_attached(spec.dataset,handle,indicator_handle)
+    return run_job_safely(spec)
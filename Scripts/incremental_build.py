@@ -0,0 +1,264 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+from multiprocessing import Pool
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Incremental version of build_final_dataset.py: instead of re-reading every CSV under
+# data/raw and overwriting final_dataset.parquet, only files not seen before (or changed)
+# are parsed, in parallel, and merged into a year partitioned Parquet dataset:
+#   data/processed/market_data/year=2024/part-<first open_time ms>.parquet
+# New candles after the last stored one are appended as a new file; only candles at or
+# before it (the overlap between runs, backfills, files that changed) are checked against
+# the stored ones: unknown times are backfilled, known ones whose values differ replace
+# the stored candle (the newest source wins), identical ones are dropped.
+# Point data.path in config/experiment.yaml at the output directory to backtest on it.
+
+BOOTSTRAP_PATH = "data/raw/bootstrap/*.csv"
+LIVE_PATH = "data/raw/symbol=BTCUSDT/*.csv"
+OUTPUT_DIR = "data/processed/market_data"
+MANIFEST_PATH = "data/processed/ingest_manifest.json"
+REWRITE_JOURNAL = "_pending_rewrite.json"  # in the output dir, "_" files are skipped by dataset readers
+
+OHLCV = ["open_time", "open", "high", "low", "close", "volume"]
+
+# Binance bootstrap column format
+BOOTSTRAP_COLUMNS = [
+    "open_time", "open", "high", "low", "close", "volume",
+    "close_time", "quote_asset_volume", "number_of_trades",
+    "taker_buy_base_volume", "taker_buy_quote_volume", "ignore"
+]
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# manifest: {path: {"size", "mtime_ns", "sha256", "rows"}} of every source file already merged
+
+def load_manifest(path):
+    return json.loads(Path(path).read_text()) if Path(path).exists() else {}
+
+
+def save_manifest(manifest, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def find_new_files(manifest, sources):
+    """[(path, kind, sha256)] of files that are new or whose contents changed."""
+    new = []
+    for kind, pattern in sources:
+        for file in sorted(glob.glob(pattern)):
+            stat = os.stat(file)
+            seen = manifest.get(file)
+            if seen and seen["size"] == stat.st_size and seen["mtime_ns"] == stat.st_mtime_ns:
+                continue  # unchanged, not even hashed
+            digest = file_digest(file)
+            if seen and seen["sha256"] == digest:
+                seen["mtime_ns"] = stat.st_mtime_ns  # touched, same contents
+                continue
+            new.append((file, kind, digest))
+    return new
+
+
+# parsing (runs in the worker processes)
+
+def parse_file(task):
+    file, kind = task
+    if kind == "bootstrap":
+        df = pd.read_csv(file, header=None, names=BOOTSTRAP_COLUMNS, usecols=OHLCV)
+        stamps = pd.to_numeric(df["open_time"], errors="coerce")
+        # Binance bootstrap dumps are ms, newer ones are 16 digit microseconds
+        unit = "us" if stamps.max() > 1e14 else "ms"
+        df["open_time"] = pd.to_datetime(stamps, unit=unit, utc=True)
+    else:
+        df = pd.read_csv(file)
+        if "timestamp" in df.columns:
+            df = df.rename(columns={"timestamp": "open_time"})
+        df = df[OHLCV]
+        df["open_time"] = pd.to_datetime(df["open_time"], utc=True, errors="coerce")
+    for col in OHLCV[1:]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    df = df.dropna()
+    df["open_time"] = df["open_time"].astype("datetime64[us, UTC]")
+    return df
+
+
+def parse_files(files, workers):
+    tasks = [(file, kind) for file, kind, _ in files]
+    if workers <= 1 or len(tasks) <= 1:
+        return [parse_file(task) for task in tasks]
+    with Pool(processes=min(workers, len(tasks))) as pool:
+        return pool.map(parse_file, tasks)
+
+
+# dataset side
+
+def partitions(out_dir):
+    return sorted(Path(out_dir).glob("year=*"), key=lambda p: int(p.name.split("=")[1]))
+
+
+def last_stored_time(out_dir):
+    # latest open_time in the dataset, from the newest partition only
+    years = partitions(out_dir)
+    if not years:
+        return None
+    table = ds.dataset(str(years[-1]), format="parquet").to_table(columns=["open_time"])
+    return pd.Timestamp(pc.max(table["open_time"]).as_py()) if table.num_rows else None
+
+
+def stored_rows(out_dir, start):
+    # every stored candle from start on, indexed by open_time (pushdown, only the tail is read)
+    dataset = ds.dataset(out_dir, format="parquet", partitioning="hive")
+    table = dataset.to_table(
+        columns=OHLCV,
+        filter=(ds.field("year") >= start.year)
+        & (ds.field("open_time") >= pa.scalar(start.to_pydatetime(), type=pa.timestamp("us", tz="UTC"))),
+    )
+    return table.to_pandas().drop_duplicates(subset=["open_time"], keep="last").set_index("open_time")
+
+
+def part_path(part, out_dir, year):
+    # one file per (year, batch); the name sorts in time order within the partition
+    first_ms = part["open_time"].iloc[0].value // 1_000_000
+    return Path(out_dir) / f"year={year}" / f"part-{first_ms:015d}.parquet"
+
+
+def write_table(part, target):
+    # hidden while written ("." files are skipped by dataset readers), renamed in when complete
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.tmp")
+    pq.write_table(pa.Table.from_pandas(part, preserve_index=False), tmp, compression="snappy")
+    return tmp
+
+
+def write_part(df, out_dir):
+    written = []
+    for year, part in df.groupby(df["open_time"].dt.year):
+        target = part_path(part, out_dir, year)
+        os.replace(write_table(part, target), target)
+        written.append(target)
+    return written
+
+
+def rewrite_partitions(df, out_dir):
+    """
+    Backfilled / replaced candles: each of their years is merged with the stored rows (the
+    new row wins on the same open_time) and rewritten. Every merged file is written first,
+    then the swap (merged files in, old files out) is recorded in the journal before any old
+    file is touched; finish_rewrite completes it, again after a crash.
+    """
+    swaps = []
+    for year, part in df.groupby(df["open_time"].dt.year):
+        folder = Path(out_dir) / f"year={year}"
+        old = sorted(folder.glob("*.parquet")) if folder.exists() else []
+        stored = [pq.read_table(file).to_pandas() for file in old]
+        merged = pd.concat(stored + [part], ignore_index=True)
+        merged = merged.drop_duplicates(subset=["open_time"], keep="last").sort_values("open_time", kind="stable")
+        target = part_path(merged, out_dir, year)
+        swaps.append({"tmp": str(write_table(merged, target)), "target": str(target), "old": [str(f) for f in old]})
+    journal = Path(out_dir) / REWRITE_JOURNAL
+    tmp = journal.with_suffix(".tmp")
+    tmp.write_text(json.dumps(swaps, indent=1))
+    os.replace(tmp, journal)
+    finish_rewrite(out_dir)
+
+
+def finish_rewrite(out_dir):
+    # completes a recorded rewrite (idempotent), then drops files of an unrecorded one
+    journal = Path(out_dir) / REWRITE_JOURNAL
+    if journal.exists():
+        for swap in json.loads(journal.read_text()):
+            if Path(swap["tmp"]).exists():
+                os.replace(swap["tmp"], swap["target"])
+            for file in swap["old"]:
+                if file != swap["target"]:
+                    Path(file).unlink(missing_ok=True)
+        journal.unlink()
+    for stray in Path(out_dir).glob("year=*/.*.tmp"):
+        stray.unlink()  # crashed before its journal was written, the old files are still complete
+
+
+def merge_new_rows(new, out_dir):
+    """Appends / backfills / replaces the parsed rows, returns (appended, backfilled, replaced, duplicates) counts."""
+    new = new.drop_duplicates(subset=["open_time"], keep="last").sort_values("open_time", kind="stable")
+    last = last_stored_time(out_dir)
+    if last is None:
+        write_part(new, out_dir)
+        return len(new), 0, 0, 0
+
+    after = new[new["open_time"] > last]
+    overlap = new[new["open_time"] <= last]
+    backfill = replaced = overlap.iloc[:0]
+    if len(overlap):
+        # compared only here, against the stored candles from the first overlapping one on
+        stored = stored_rows(out_dir, overlap["open_time"].iloc[0])
+        known = overlap["open_time"].isin(stored.index).to_numpy()
+        backfill = overlap[~known]
+        old = stored.loc[overlap.loc[known, "open_time"], OHLCV[1:]].to_numpy()
+        differs = (overlap.loc[known, OHLCV[1:]].to_numpy() != old).any(axis=1)
+        replaced = overlap[known][differs]
+        if len(backfill) or len(replaced):
+            rewrite_partitions(pd.concat([backfill, replaced]), out_dir)
+    if len(after):
+        write_part(after, out_dir)
+    return len(after), len(backfill), len(replaced), len(overlap) - len(backfill) - len(replaced)
+
+
+def ingest(sources, out_dir=OUTPUT_DIR, manifest_path=MANIFEST_PATH, workers=None, full=False):
+    if full:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        manifest = {}
+    else:
+        manifest = load_manifest(manifest_path)
+        if Path(out_dir).exists():
+            finish_rewrite(out_dir)  # a rewrite interrupted by a crash
+
+    files = find_new_files(manifest, sources)
+    print(f"{len(files)} new or changed files, {len(manifest)} already merged")
+    if files:
+        frames = parse_files(files, workers or os.cpu_count() or 1)
+        rows = [df for df in frames if len(df)]
+        if rows:
+            appended, backfilled, replaced, duplicates = merge_new_rows(pd.concat(rows, ignore_index=True), out_dir)
+            print(f"Appended {appended} rows, backfilled {backfilled}, replaced {replaced}, "
+                  f"dropped {duplicates} duplicates")
+        # recorded only after the data is written: a crash re-parses these files next time
+        # and the overlap check drops what already made it in
+        for (file, _, digest), df in zip(files, frames):
+            stat = os.stat(file)
+            manifest[file] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest, "rows": len(df)}
+    save_manifest(manifest, manifest_path)
+    last = last_stored_time(out_dir) if Path(out_dir).exists() else None
+    print("Latest candle:", last)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge new raw candle files into the partitioned dataset")
+    parser.add_argument("--bootstrap", default=BOOTSTRAP_PATH)
+    parser.add_argument("--live", default=LIVE_PATH)
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    parser.add_argument("--workers", type=int, help="parser processes (default: all cores)")
+    parser.add_argument("--full", action="store_true", help="forget the manifest and rebuild from every file")
+    args = parser.parse_args()
+
+    ingest([("bootstrap", args.bootstrap), ("live", args.live)],
+           args.output, args.manifest, args.workers, args.full)
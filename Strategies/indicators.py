@@ -0,0 +1,256 @@
+import math
+from collections import deque
+
+import numpy as np
+
+# Streaming indicators: every update() is O(1) and the state is bounded by the window,
+# so per-bar cost and memory stay constant no matter how many candles are fed.
+
+RESUM_EVERY = 1024  # RollingSum re-sums its window exactly every this many updates
+
+
+class RollingSum:
+    """
+    Sum of the last `window` values.
+    The window sum is updated with (new - evicted) per bar and re-summed exactly
+    (math.fsum) every RESUM_EVERY updates, so the rounding error is bounded by that
+    many steps instead of growing with the length of the data.
+    Before the window fills it returns the sum of what has been seen so far.
+    """
+    def __init__(self, window):
+        self.window = window
+        self.total = 0.0
+        self.count = 0
+        self._values = deque(maxlen=window)
+
+    def update(self, value):
+        evicted = self._values[0] if len(self._values) == self.window else 0.0
+        self._values.append(value)
+        self.total += value - evicted
+        self.count += 1
+        if self.count % RESUM_EVERY == 0:
+            self.total = math.fsum(self._values)
+        return self.value
+
+    @property
+    def value(self):
+        return self.total
+
+    @property
+    def ready(self):
+        return self.count >= self.window
+
+
+class RollingSMA:
+    """Simple moving average over a fixed window, None until the window is full."""
+    def __init__(self, window):
+        self.window = window
+        self._sum = RollingSum(window)
+
+    def update(self, value):
+        self._sum.update(value)
+        return self.value
+
+    @property
+    def value(self):
+        if not self._sum.ready:
+            return None
+        return self._sum.value / self.window
+
+
+class EMA:
+    """Exponential moving average seeded with the first value."""
+    def __init__(self, period):
+        self.period = period
+        self.k = 2 / (period + 1)
+        self.value = None
+
+    def update(self, value):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value = value * self.k + self.value * (1 - self.k)
+        return self.value
+
+
+class ATR:
+    """
+    Average true range with Wilder smoothing (alpha = 1/period),
+    seeded with the first true range.
+    """
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 1 / period
+        self.prev_close = None
+        self.value = None
+
+    def update(self, high, low, close):
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+
+        if self.value is None:
+            self.value = tr
+        else:
+            self.value = self.alpha * tr + (1 - self.alpha) * self.value
+        return self.value
+
+
+class RollingRSI:
+    """
+    RSI over the last `period` close-to-close changes (simple averages, not Wilder).
+    Returns 50 until period + 1 closes have been seen.
+    """
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.count = 0
+        self._gains = RollingSum(period)
+        self._losses = RollingSum(period)
+
+    def update(self, close):
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            self._gains.update(delta if delta > 0 else 0.0)
+            self._losses.update(-delta if delta < 0 else 0.0)
+        self.prev_close = close
+        self.count += 1
+        return self.value
+
+    @property
+    def value(self):
+        if self.count < self.period + 1:
+            return 50
+        avg_gain = self._gains.value / self.period
+        avg_loss = self._losses.value / self.period
+        if avg_loss == 0:
+            return 100
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+class History:
+    """Bounded history of the last `size` values, newest last."""
+    def __init__(self, size):
+        self.size = size
+        self.count = 0
+        self._values = deque(maxlen=size)
+
+    def append(self, value):
+        self._values.append(value)
+        self.count += 1
+
+    def ago(self, n):
+        # ago(0) is the latest value, ago(size - 1) the oldest one kept
+        return self._values[-1 - n]
+
+    def __len__(self):
+        return len(self._values)
+
+
+# Whole-array versions for the vectorized backend. They use the same arithmetic as the
+# streaming classes above (same window sum steps and re-sums, same EMA/ATR recurrences),
+# so both paths produce bit-identical values and therefore identical signals.
+
+def rolling_sum_array(values, window):
+    # RollingSum over the whole array: np.add.accumulate adds sequentially like the
+    # streaming total, one accumulate per RESUM_EVERY segment, fsum at each segment end
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    evicted = np.zeros(n)
+    if n > window:
+        evicted[window:] = values[:n - window]
+    steps = values - evicted
+    out = np.empty(n)
+    total = 0.0
+    for start in range(0, n, RESUM_EVERY):
+        stop = min(start + RESUM_EVERY, n)
+        out[start:stop] = np.add.accumulate(np.concatenate(([total], steps[start:stop])))[1:]
+        if stop % RESUM_EVERY == 0:
+            out[stop - 1] = math.fsum(values[max(stop - window, 0):stop].tolist())
+        total = out[stop - 1]
+    return out
+
+
+def sma_array(values, window):
+    out = rolling_sum_array(values, window) / window
+    out[:window - 1] = np.nan
+    return out
+
+
+def ema_array(values, period):
+    # recursive filter, so this stays a tight scalar loop over a plain list
+    k = 2 / (period + 1)
+    out = []
+    ema = None
+    for value in np.asarray(values, dtype=np.float64).tolist():
+        ema = value if ema is None else value * k + ema * (1 - k)
+        out.append(ema)
+    return np.array(out, dtype=np.float64)
+
+
+def true_range_array(high, low, close):
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    tr = high - low
+    prev_close = close[:-1]
+    tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)))
+    return tr
+
+
+def atr_array(high, low, close, period):
+    alpha = 1 / period
+    out = []
+    atr = None
+    for tr in true_range_array(high, low, close).tolist():
+        atr = tr if atr is None else alpha * tr + (1 - alpha) * atr
+        out.append(atr)
+    return np.array(out, dtype=np.float64)
+
+
+def rsi_array(close, period=14):
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(len(close), 50.0)
+    if len(close) < period + 1:
+        return out
+    delta = np.diff(close)
+    gains = rolling_sum_array(np.where(delta > 0, delta, 0.0), period)
+    losses = rolling_sum_array(np.where(delta < 0, -delta, 0.0), period)
+    avg_gain = gains[period - 1:] / period
+    avg_loss = losses[period - 1:] / period
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
+    out[period:] = np.where(avg_loss == 0, 100.0, rsi)
+    return out
+
+
+def compute_indicators(columns, specs, cache=None):
+    """
+    Compute {name: spec} indicator specs (e.g. {"sma_20": ("sma", 20)}) into
+    {name: array}. Anything already in `cache` is reused instead of recomputed,
+    which is how a sweep shares one computation across all its jobs.
+    """
+    out = {} if cache is None else cache
+    for name, spec in specs.items():
+        if name in out:
+            continue
+        kind, *args = spec
+        if kind == "sma":
+            out[name] = sma_array(columns["close"], *args)
+        elif kind == "ema":
+            out[name] = ema_array(columns["close"], *args)
+        elif kind == "atr":
+            out[name] = atr_array(columns["high"], columns["low"], columns["close"], *args)
+        elif kind == "atr_avg":
+            atr_period, window = args
+            atr_name = f"atr_{atr_period}"
+            compute_indicators(columns, {atr_name: ("atr", atr_period)}, out)
+            out[name] = rolling_sum_array(out[atr_name], window) / window
+        elif kind == "rsi":
+            out[name] = rsi_array(columns["close"], *args)
+        else:
+            raise ValueError(f"Unknown indicator: {kind}")
+    return out
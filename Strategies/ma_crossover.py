@@ -1,92 +1,76 @@
+import numpy as np
+
 from Strategies.basic_strategy import BaseStrategy
+from Strategies.indicators import (
+    ATR, EMA, History, RollingRSI, RollingSMA, RollingSum,
+    compute_indicators,
+)
 
 class MACrossoverStrategy(BaseStrategy):
-    def __init__(self, short_window=20, long_window=50, ema_period=200, atr_period=14):
+    def __init__(self, short_window=20, long_window=50, ema_period=200, atr_period=14,
+                 rsi_low=50, rsi_high=75, sl_atr_mult=2.5):
         BaseStrategy.__init__(self) 
         self.short_window = short_window
         self.long_window = long_window
         self.ema_period = ema_period
         self.atr_period = atr_period
+        self.rsi_low = rsi_low
+        self.rsi_high = rsi_high
+        self.sl_atr_mult = sl_atr_mult
         
-        self.prices = [] 
-        self.highs = []
-        self.lows = []
-        
+        # Streaming indicators, O(1) per bar and fixed memory
+        self.sma_short = RollingSMA(short_window)
+        self.sma_long = RollingSMA(long_window)
+        self.ema_indicator = EMA(ema_period)
+        self.atr_indicator = ATR(atr_period)
+        self.rsi = RollingRSI(14)
+        self.ema_history = History(10)   # only the lag used by the slope filter is kept
+        self.atr_sum = RollingSum(20)    # for the 20 bar ATR average
+        self.bars = 0
+
         self.ema = None
-        self.ema_history = []
         self.atr = None
-        self.atr_history = []
-        self.prev_close = None
         self.sl_price = None
         
         # New: Tracking for strict crossover
         self.prev_sma_short = None
         self.prev_sma_long = None
 
-    def calculate_rsi(self, period=14):
-        if len(self.prices) < period + 1:
-            return 50
-        deltas = [self.prices[i] - self.prices[i-1] for i in range(-period, 0)]
-        gains = [d for d in deltas if d > 0]
-        losses = [-d for d in deltas if d < 0]
-        avg_gain = sum(gains) / period
-        avg_loss = sum(losses) / period
-        if avg_loss == 0:
-            return 100
-        rs = avg_gain / avg_loss
-        return 100 - (100 / (1 + rs))
-
     def on_candle(self, candle):
         close_price = candle["close"]
         high_price = candle["high"]
         low_price = candle["low"]
-        
-        self.prices.append(close_price)
-        self.highs.append(high_price)
-        self.lows.append(low_price)
+        self.bars += 1
+
+        # Moving Averages
+        sma_short = self.sma_short.update(close_price)
+        sma_long = self.sma_long.update(close_price)
 
         # Update EMA 200
-        if self.ema is None:
-            self.ema = close_price
-        else:
-            k = 2 / (self.ema_period + 1)
-            self.ema = close_price * k + self.ema * (1 - k)
+        self.ema = self.ema_indicator.update(close_price)
         self.ema_history.append(self.ema)
 
         # Update ATR
-        tr = high_price - low_price
-        if self.prev_close is not None:
-            tr = max(tr, abs(high_price - self.prev_close), abs(low_price - self.prev_close))
-        
-        if self.atr is None:
-            self.atr = tr
-        else:
-            alpha = 1 / self.atr_period
-            self.atr = alpha * tr + (1 - alpha) * self.atr
-        self.atr_history.append(self.atr)
-        
-        self.prev_close = close_price
+        self.atr = self.atr_indicator.update(high_price, low_price, close_price)
+        self.atr_sum.update(self.atr)
+
+        rsi = self.rsi.update(close_price)
 
         # Wait for enough data
-        if len(self.prices) < self.long_window + self.atr_period:
+        if self.bars < self.long_window + self.atr_period:
             return "HOLD"
 
-        # Moving Averages
-        sma_short = sum(self.prices[-self.short_window:]) / self.short_window
-        sma_long = sum(self.prices[-self.long_window:]) / self.long_window
-        
         # 1. EMA Slope Filter (Ensure long term trend is actually rising)
         ema_rising = False
-        if len(self.ema_history) > 10:
-            ema_rising = self.ema > self.ema_history[-10]
+        if self.ema_history.count > 10:
+            ema_rising = self.ema > self.ema_history.ago(9)
 
         # 2. ATR Volatility Filter (Avoid "Dead" non-moving markets)
-        avg_atr = sum(self.atr_history[-20:]) / 20
+        avg_atr = self.atr_sum.value / 20
         high_vol = self.atr > (0.8 * avg_atr)
 
         # 3. RSI Momentum (Ensure we aren't buying overextended or weak)
-        rsi = self.calculate_rsi(14)
-        bullish_momentum = 50 < rsi < 75
+        bullish_momentum = self.rsi_low < rsi < self.rsi_high
 
         # 4. Strict Crossover Logic
         cross_up = False
@@ -102,8 +86,8 @@ class MACrossoverStrategy(BaseStrategy):
                 and ema_rising and high_vol and bullish_momentum 
                 and self.position == 0):
             
-            # Entry found - Set ATR based Stop Loss (2.5 * ATR for buffer)
-            self.sl_price = close_price - (2.5 * self.atr)
+            # Entry found - Set ATR based Stop Loss (2.5 * ATR buffer by default)
+            self.sl_price = close_price - (self.sl_atr_mult * self.atr)
             self.position = 1
             return "BUY"
 
@@ -121,4 +105,62 @@ class MACrossoverStrategy(BaseStrategy):
     def sync_position(self, pos):
         self.position = pos
         if pos == 0:
-            self.sl_price = None
\ No newline at end of file
+            self.sl_price = None
+
+    def required_indicators(self):
+        # whole-array indicators used by vectorized_signals, names are shared across a sweep
+        return {
+            f"sma_{self.short_window}": ("sma", self.short_window),
+            f"sma_{self.long_window}": ("sma", self.long_window),
+            f"ema_{self.ema_period}": ("ema", self.ema_period),
+            f"atr_{self.atr_period}": ("atr", self.atr_period),
+            f"atr_avg_{self.atr_period}_20": ("atr_avg", self.atr_period, 20),
+            "rsi_14": ("rsi", 14),
+        }
+
+    def vectorized_signals(self, columns, indicators=None):
+        """
+        Whole-array version of on_candle for the vectorized backend.
+        Returns the bars where on_candle would say BUY while flat ("buy"), SELL while
+        long ("sell") and the stop loss it would set on entry ("sl").
+        Position handling is left to the engine since it depends on the portfolio.
+        `indicators` can hold precomputed arrays (see Runner/indicator_cache.py);
+        anything missing is computed here.
+        """
+        close = np.asarray(columns["close"], dtype=np.float64)
+        n = len(close)
+        bars = np.arange(1, n + 1)
+
+        values = compute_indicators(columns, self.required_indicators(), dict(indicators or {}))
+        sma_short = values[f"sma_{self.short_window}"]
+        sma_long = values[f"sma_{self.long_window}"]
+        ema = values[f"ema_{self.ema_period}"]
+        atr = values[f"atr_{self.atr_period}"]
+        avg_atr = values[f"atr_avg_{self.atr_period}_20"]
+        rsi = values["rsi_14"]
+
+        # Wait for enough data
+        active = bars >= self.long_window + self.atr_period
+
+        ema_rising = np.zeros(n, dtype=bool)
+        ema_rising[9:] = (bars[9:] > 10) & (ema[9:] > ema[:-9])
+
+        high_vol = atr > (0.8 * avg_atr)
+
+        bullish_momentum = (self.rsi_low < rsi) & (rsi < self.rsi_high)
+
+        # strict crossover, previous SMAs only exist once the previous bar was active
+        cross_up = np.zeros(n, dtype=bool)
+        cross_up[1:] = (active[:-1] & (sma_short[:-1] <= sma_long[:-1])
+                        & (sma_short[1:] > sma_long[1:]))
+
+        with np.errstate(invalid="ignore"):
+            buy = (active & cross_up & (sma_short > sma_long) & (sma_long > ema)
+                   & ema_rising & high_vol & bullish_momentum)
+            sell = active & (sma_long > sma_short)
+
+        return {
+            "buy": buy,
+            "sell": sell,
+            "sl": close - (self.sl_atr_mult * atr),
+        }
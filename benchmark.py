@@ -1,28 +1,349 @@
+import argparse
+import json
+import platform
+import sys
+import tempfile
 import time
-from Runner.config_loader import load_config
-from Runner.strategy_factory import generate_strategies
-from Runner.job_builder import build_jobs
-from Runner.batch_runner import run_batched
-
-def benchmark():
-    config = load_config("config/experiment.yaml")
-    strategy_params = generate_strategies(config)
-    jobs = build_jobs(config, strategy_params)
-
-    start = time.time()
-    results = run_batched(
-        jobs,
-        workers=config["parallel"]["workers"],
-        batch_size=config["parallel"]["batch_size"]
-    )
-    end = time.time()
-
-    total_time = end - start
-    total_strategies = len(results)
-
-    print("Total strategies:", total_strategies)
-    print("Total time (sec):", round(total_time, 2))
-    print("Avg time / strategy (sec):", round(total_time / total_strategies, 4))
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from Engine.backtesting_engine import BacktestingEngine
+from Engine.datafeed import DataFeed, ArrayDataFeed, StreamingDataFeed, Candle, to_columns
+from Engine.execution import ExecutionEngine
+from Engine.metrics import Metrics
+from Engine.portfolio import Portfolio
+from Engine.synthetic_data import generate_ohlcv
+from Engine.vectorized_engine import VectorizedBacktestingEngine
+from Runner.batch_runner import run_streaming
+from Runner.job_spec import JobSpec
+from Strategies.ma_crossover import MACrossoverStrategy
+from reporting.sinks import ResultSink
+
+# Offline benchmark suite: every benchmark runs on deterministic synthetic candles,
+# results go to JSON and can be compared against a stored baseline to catch slowdowns.
+
+DEFAULT_OUTPUT = "benchmarks/latest.json"
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+CAPITAL = 100000
+ROW_FEED_LIMIT = 20000  # the iloc DataFeed is ~100x slower, keep its run short
+STREAM_BATCH = 50000
+
+
+def measure(setup, candles, repeat, memory):
+    """
+    setup() builds fresh state and returns the callable to time, so object
+    construction is not counted. Best of `repeat` runs; peak traced memory
+    comes from one extra untimed run under tracemalloc.
+    """
+    times = []
+    for _ in range(repeat):
+        action = setup()
+        start = time.perf_counter()
+        action()
+        times.append(time.perf_counter() - start)
+
+    best = min(times)
+    stats = {"seconds": round(best, 6), "candles_per_sec": round(candles / best, 1)}
+    if memory:
+        action = setup()
+        tracemalloc.start()
+        action()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats["peak_mb"] = round(peak / 1e6, 3)
+    return stats
+
+
+# individual benchmarks, each returns {case name: stats}
+
+def bench_datafeed(data, columns, args):
+    rows = data.iloc[:ROW_FEED_LIMIT]
+
+    def drain(feed):
+        def action():
+            while feed.has_next():
+                feed.next_candle()["close"]
+        return action
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = str(Path(tmp) / "synthetic.parquet")
+        data.to_parquet(data_path, index=False)
+
+        def streaming():
+            feed = StreamingDataFeed(data_path, batch_size=STREAM_BATCH)
+            action = drain(feed)
+
+            def run():
+                with feed:
+                    action()
+            return run
+
+        return {
+            "DataFeed": measure(lambda: drain(DataFeed(rows)), len(rows), args.repeat, args.memory),
+            "ArrayDataFeed": measure(lambda: drain(ArrayDataFeed(columns)), len(data), args.repeat, args.memory),
+            # includes reading + decoding the file, the in-memory feeds get their columns for free
+            "StreamingDataFeed": measure(streaming, len(data), args.repeat, args.memory),
+        }
+
+
+def bench_strategy(data, columns, args):
+    candles = [Candle(columns, i) for i in range(len(data))]
+
+    def setup():
+        strategy = MACrossoverStrategy(20, 50)
+
+        def action():
+            for candle in candles:
+                signal = strategy.on_candle(candle)
+                if signal == "BUY":
+                    strategy.sync_position(0)  # keep generating entries
+        return action
+
+    return {"MACrossoverStrategy.on_candle": measure(setup, len(candles), args.repeat, args.memory)}
+
+
+def bench_portfolio(data, columns, args):
+    rng = np.random.default_rng(args.seed)
+    prices = columns["close"].tolist()
+    signals = rng.choice(np.array([None, "BUY", "SELL"], dtype=object), len(prices), p=[0.98, 0.01, 0.01]).tolist()
+
+    def setup():
+        portfolio = Portfolio(CAPITAL, Metrics(CAPITAL))
+
+        def action():
+            for signal, price in zip(signals, prices):
+                portfolio.update(signal, price)
+                portfolio.get_equity(price)
+        return action
+
+    return {"Portfolio.update": measure(setup, len(prices), args.repeat, args.memory)}
+
+
+def bench_metrics(data, columns, args):
+    equity = (CAPITAL + np.cumsum(np.random.default_rng(args.seed).normal(0, 50, len(data)))).tolist()
+
+    def setup():
+        metrics = Metrics(CAPITAL)
+
+        def action():
+            for value in equity:
+                metrics.update_equity(value)
+            metrics.summary()
+        return action
+
+    return {"Metrics": measure(setup, len(equity), args.repeat, args.memory)}
+
+
+def bench_engine(data, columns, args):
+    def setup(engine_cls, source):
+        def make():
+            metrics = Metrics(CAPITAL)
+            engine = engine_cls(source(), ExecutionEngine(), MACrossoverStrategy(20, 50),
+                                Portfolio(CAPITAL, metrics), metrics)
+            return engine.run
+        return make
+
+    return {
+        "BacktestingEngine": measure(setup(BacktestingEngine, lambda: ArrayDataFeed(columns)),
+                                     len(data), args.repeat, args.memory),
+        "VectorizedBacktestingEngine": measure(setup(VectorizedBacktestingEngine, lambda: columns),
+                                               len(data), args.repeat, args.memory),
+    }
+
+
+class TimingSink(ResultSink):
+    """
+    Records when each result reaches the sink (seconds since the sweep started) and, as a
+    fallback where the resource module does not exist, the peak RSS of the pool workers.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.arrivals = []
+        self.peak_mb = None
+
+    def handle(self, result):
+        self.arrivals.append(time.perf_counter() - self.start)
+        rss = workers_rss_mb()
+        if rss is not None:
+            self.peak_mb = max(self.peak_mb or 0.0, rss)
+
+
+def workers_rss_mb():
+    """
+    Largest RSS among the live child processes via psutil (Windows: peak working set).
+    None without psutil.
+    """
+    try:
+        import psutil
+    except ImportError:
+        return None
+    peak = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            info = child.memory_info()
+        except psutil.Error:
+            continue  # exited meanwhile
+        peak = max(peak, getattr(info, "peak_wset", info.rss))
+    return peak / (1024 * 1024)
+
+
+def children_peak_mb():
+    # peak RSS of every waited for child process, Unix only
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB on Linux
+
+
+def bench_runner(data, columns, args):
+    # the real sweep path: run_streaming (WorkerPool, shared data, chunking, sink delivery)
+    results = {}
+    sink_peaks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = str(Path(tmp) / "synthetic.parquet")
+        data.to_parquet(data_path, index=False)
+
+        for backend in ("event", "vectorized"):
+            jobs = [
+                JobSpec.create("ma_crossover", {"short_window": s, "long_window": l},
+                               {"commission": 0.001, "slippage": 0.0005}, {"capital": CAPITAL},
+                               data_path, backend)
+                for s in (5, 10, 20, 30) for l in (50, 80, 100, 120)
+            ]
+            sink = TimingSink()
+            run_streaming(jobs, args.workers, sink, progress=False)
+            wall = time.perf_counter() - sink.start
+            sink_peaks.append(sink.peak_mb)
+
+            p50, p90, p99 = np.percentile(sink.arrivals, [50, 90, 99])
+            results[f"runner[{backend}]"] = {
+                "jobs": len(jobs),
+                "seconds": round(wall, 6),
+                "candles_per_sec": round(len(data) * len(jobs) / wall, 1),
+                # time until a result reaches the sink, what streaming is meant to keep low
+                "result_p50": round(float(p50), 6),
+                "result_p90": round(float(p90), 6),
+                "result_p99": round(float(p99), 6),
+            }
+    peak = children_peak_mb()
+    if peak is None:
+        peak = max((p for p in sink_peaks if p is not None), default=None)
+    if peak is not None:  # skipped where neither resource nor psutil is available
+        results["workers_peak_rss_mb"] = {"peak_mb": round(peak, 1)}
+    return results
+
+
+BENCHMARKS = {
+    "datafeed": bench_datafeed,
+    "strategy": bench_strategy,
+    "portfolio": bench_portfolio,
+    "metrics": bench_metrics,
+    "engine": bench_engine,
+    "runner": bench_runner,
+}
+
+
+# baseline comparison
+
+HIGHER_IS_BETTER = ("candles_per_sec",)
+LOWER_IS_BETTER = ("result_p50", "result_p90", "result_p99", "peak_mb")
+
+
+def compare(current, baseline, tolerance):
+    """Returns a list of human readable regressions beyond `tolerance` (0.15 = 15%)."""
+    regressions = []
+    for case, stats in current["results"].items():
+        base = baseline.get("results", {}).get(case)
+        if not base:
+            continue
+        for key, value in stats.items():
+            if key not in base or not base[key]:
+                continue
+            change = (value - base[key]) / base[key]
+            if key in HIGHER_IS_BETTER and change < -tolerance:
+                regressions.append(f"{case} {key}: {base[key]} -> {value} ({change:+.1%})")
+            elif key in LOWER_IS_BETTER and change > tolerance:
+                regressions.append(f"{case} {key}: {base[key]} -> {value} ({change:+.1%})")
+    return regressions
+
+
+def print_report(report):
+    for case, stats in report["results"].items():
+        line = "  ".join(f"{k}={v}" for k, v in stats.items())
+        print(f"{case:<40} {line}")
+
+
+def benchmark(args):
+    if args.data:
+        from Engine.data_loader import DataLoader
+        data = DataLoader().load_data(args.data)
+    else:
+        data = generate_ohlcv(args.candles, volatility=args.volatility, seed=args.seed)
+    columns = to_columns(data)
+
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    report = {
+        "meta": {
+            "candles": len(data),
+            "volatility": args.volatility,
+            "seed": args.seed,
+            "data": args.data or "synthetic",
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {},
+    }
+    for name in selected:
+        print(f"Running {name} ...", flush=True)
+        report["results"].update(BENCHMARKS[name](data, columns, args))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtesting engine benchmark suite (offline, synthetic data)")
+    parser.add_argument("--candles", type=int, default=200000)
+    parser.add_argument("--volatility", type=float, default=0.004)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data", help="benchmark on a real .parquet/.csv instead of synthetic candles")
+    parser.add_argument("--only", help=f"comma separated subset of: {','.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc pass")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    report = benchmark(args)
+    print_report(report)
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print("Results written to", args.output)
+
+    if args.save_baseline:
+        Path(args.baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.baseline).write_text(json.dumps(report, indent=2))
+        print("Baseline saved to", args.baseline)
+        return 0
+
+    if Path(args.baseline).exists():
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) vs {args.baseline}:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print(f"No regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
 
 if __name__ == "__main__":
-    benchmark()
+    sys.exit(main())
@@ -1,17 +1,21 @@
+import argparse
 import time
 from pathlib import Path
 
+import pandas as pd
+
 from Runner.config_loader import load_config
 from Runner.strategy_factory import generate_strategies
 from Runner.job_builder import build_jobs
-from Runner.batch_runner import run_batched
-
-from reporting.result_writer import save_run_result, append_summary
-from reporting.plots import (
-    compute_drawdown,
-    plot_equity_curve,
-    plot_drawdown_curve
-)
+from Runner.batch_runner import run_streaming
+from Runner.result_cache import cache_from_config
+from Runner.optimizer import optimize
+from Runner.walk_forward import run_walk_forward
+from Runner.manifest import manifest_from_config
+from Runner.distributed import distributed_from_config, run_distributed
+
+from reporting.sinks import StoreSink
+from reporting.result_store import ResultStore
 from reporting.analytics import enrich_summary
 
 
@@ -20,47 +24,113 @@ DATA_PATH = r"C:\Resume_Projects\Backtesting_Engine\data\raw\sample_data.csv"
 
 
 def main():
-    
+    parser = argparse.ArgumentParser(description="Run the experiment in config/experiment.yaml")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the last sweep from its checkpoint manifest, only unfinished jobs run")
+    args = parser.parse_args()
+
     # Load config
 
     config = load_config("config/experiment.yaml")
 
-    # Generate strategies
-    strategy_params = generate_strategies(config)
+    if config.get("walk_forward", {}).get("enabled", False):
+        return main_walk_forward(config)
 
-    # Build jobs
-    jobs = build_jobs(config, strategy_params)
+    # Run jobs, every result goes straight to the result store as it finishes,
+    # so writing overlaps with the backtests
 
-    # Run batched jobs
+    store = ResultStore(batch_size=config.get("results", {}).get("batch_size", 64)).reset()
+    sink = StoreSink(store)
 
     start = time.time()
-    results = run_batched(
-        jobs,
-        workers=config["parallel"]["workers"],
-        batch_size=config["parallel"]["batch_size"]
-    )
+    search_mode = config.get("optimizer", {}).get("mode", "grid")
+    distributed = distributed_from_config(config)
+    if search_mode == "grid" and distributed:
+        # workers on any host pull the jobs from a shared queue file
+        jobs = build_jobs(config, generate_strategies(config))
+        total = run_distributed(
+            jobs,
+            sink,
+            queue_path=distributed.get("queue", "results/queue.sqlite"),
+            local_workers=distributed.get("local_workers", config["parallel"]["workers"]),
+            batch=distributed.get("batch", 4),
+            heartbeat_timeout=distributed.get("heartbeat_timeout", 30),
+            max_attempts=distributed.get("max_attempts", 3),
+            cache=cache_from_config(config)
+        )
+    elif search_mode == "grid":
+        # Generate strategies
+        strategy_params = generate_strategies(config)
+
+        # Build jobs
+        jobs = build_jobs(config, strategy_params)
+
+        manifest = manifest_from_config(config, resume=args.resume) #every finished job is checkpointed
+        total = run_streaming(
+            jobs,
+            workers=config["parallel"]["workers"],
+            sink=sink,
+            chunksize=config["parallel"].get("chunksize", 1),
+            group_size=config["parallel"].get("group_size", 1),
+            cache=cache_from_config(config), #only new combinations are computed when enabled
+            profiling=config.get("profiling"),
+            manifest=manifest,
+            retries=config.get("checkpoint", {}).get("retries", 0)
+        )
+        if manifest is not None:
+            print("Manifest:", manifest.counts())
+            manifest.close()
+    else:
+        # adaptive search, only the full data results end up in the store
+        optimizer = optimize(config, sink)
+        total = len(optimizer.results)
+        print(f"Optimizer ({search_mode}): {optimizer.evaluated} backtests run, {total} on the full data")
+        for result in optimizer.best(3):
+            print("  best:", result["strategy_id"], optimizer.metric, result.get(optimizer.metric))
     end = time.time()
 
     # DEBUG COUNTS (VERY IMPORTANT)
 
-    print("Total strategies run:", len(results))
-    print("Total backtest time:", round(end - start, 2), "seconds")
-
-    # Reporting pipeline
-    for result in results:
-
-        # outputs
-        save_run_result(result)
-        append_summary(result)
-
-        # plots
-        drawdowns = compute_drawdown(result["equity_curve"])
-        plot_equity_curve(result["strategy_id"], result["equity_curve"])
-        plot_drawdown_curve(result["strategy_id"], drawdowns)
+    print("Total strategies run:", total)
+    print("Total backtest + reporting time:", round(end - start, 2), "seconds")
 
     #enrich summary ONCE
-    if results:
+    if total:
         enrich_summary()
+        terminated = store.summary(columns=["terminated"])["terminated"].sum()
+        print("Terminated early by stop rules:", int(terminated))
+        print(store.top(5)[["strategy_id", "total_pnl", "max_drawdown", "win_rate", "total_trades"]])
+
+    # plots, rendered in a process pool and only for the strategies asked for
+    plot_config = config.get("plots", {})
+    if total and plot_config.get("enabled", True):
+        from reporting.plots import render_plots #matplotlib only imported when plotting
+
+        start = time.time()
+        rendered = render_plots(
+            store,
+            top_n=plot_config.get("top_n"),
+            by=plot_config.get("by", "total_pnl"),
+            max_points=plot_config.get("max_points", 2000),
+            workers=plot_config.get("workers", config["parallel"]["workers"])
+        )
+        print("Plotted", len(rendered), "strategies in", round(time.time() - start, 2), "seconds")
+
+
+def main_walk_forward(config):
+    # out of sample mode: optimise on every train window, trade the winner on the next test window
+    start = time.time()
+    wf = run_walk_forward(config)
+    output = wf.save()
+    print(pd.DataFrame(wf.rows).to_string(index=False))
+    print("Out of sample:", wf.out_of_sample_summary())
+    print("Walk-forward time:", round(time.time() - start, 2), "seconds, written to", output)
+
+    if len(wf.stitched) and config.get("plots", {}).get("enabled", True):
+        from reporting.plots import plot_equity_curve #matplotlib only imported when plotting
+
+        plot_equity_curve("walk_forward_oos", wf.stitched["equity"].to_numpy(),
+                          config.get("plots", {}).get("max_points", 2000))
 
 
 if __name__ == "__main__":
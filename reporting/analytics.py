@@ -1,39 +1,33 @@
-import csv
+import numpy as np
 from pathlib import Path
 
+from reporting.result_store import ResultStore, STORE_DIR
+
 SUMMARY_FILE = "results/summary.csv"
 
 
-def enrich_summary():
-    if not Path(SUMMARY_FILE).exists():
-        return
+def enrich_summary(store_root=STORE_DIR, csv_path=SUMMARY_FILE):
+    store = ResultStore(store_root)
+    df = store.summary()
+    if df.empty:
+        return df
 
-    with open(SUMMARY_FILE, "r") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    pnl = df["total_pnl"].astype(float)
+    trades = df["total_trades"].astype(int)
+    dd = df["max_drawdown"].astype(float).abs()
 
     # Derived metrics
-    for row in rows:
-        pnl = float(row["total_pnl"])
-        trades = int(row["trades"])
-        dd = abs(float(row["max_drawdown"]))
-
-        row["pnl_per_trade"] = pnl / trades if trades > 0 else 0
-        row["pnl_to_dd_ratio"] = pnl / dd if dd > 0 else 0
-
-    # Ranking
-    rows.sort(key=lambda x: float(x["total_pnl"]), reverse=True)
-    for i, row in enumerate(rows):
-        row["rank_by_pnl"] = i + 1
-
-    rows.sort(key=lambda x: abs(float(x["max_drawdown"])))
-    for i, row in enumerate(rows):
-        row["rank_by_drawdown"] = i + 1
-
-    # Write back enriched CSV
-    fieldnames = rows[0].keys()
-
-    with open(SUMMARY_FILE, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    df["pnl_per_trade"] = np.where(trades > 0, pnl / trades.where(trades > 0, 1), 0.0)
+    df["pnl_to_dd_ratio"] = np.where(dd > 0, pnl / dd.where(dd > 0, 1), 0.0)
+
+    # Ranking (ties keep their original order, like a stable sort)
+    df["rank_by_pnl"] = pnl.rank(ascending=False, method="first").astype(int)
+    df["rank_by_drawdown"] = dd.rank(ascending=True, method="first").astype(int)
+
+    df = df.sort_values("rank_by_drawdown").reset_index(drop=True)
+
+    # Write enriched table back next to the store, plus a CSV for quick reading
+    df.to_parquet(Path(store_root) / "enriched.parquet", index=False)
+    if csv_path:
+        store.export_csv(csv_path, df)
+    return df
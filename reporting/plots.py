@@ -1,38 +1,96 @@
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
+from matplotlib.figure import Figure
+
+PLOTS_DIR = "results/plots"
+
+# Figures are built with the object oriented API (matplotlib.figure.Figure renders
+# through Agg on savefig) so there is no pyplot global state and rendering is safe
+# to run in a process pool.
+
+
 def compute_drawdown(equity_curve):
-    drawdowns = []
-    peak = equity_curve[0]
+    equity = np.asarray(equity_curve, dtype=np.float64)
+    peak = np.maximum.accumulate(equity)
+    return (equity - peak) / peak
+
+
+def downsample(values, max_points):
+    """
+    Reduces a long curve to about max_points for drawing. Each bucket keeps its
+    min and max so spikes and the deepest drawdown survive. Returns (x, y).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if not max_points or n <= max_points:
+        return np.arange(n), values
+
+    buckets = max(1, max_points // 2)
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    starts = edges[:-1]
+    lows = np.minimum.reduceat(values, starts)
+    highs = np.maximum.reduceat(values, starts)
+    low_idx = np.array([s + np.argmin(values[s:e]) for s, e in zip(starts, edges[1:])])
+    high_idx = np.array([s + np.argmax(values[s:e]) for s, e in zip(starts, edges[1:])])
+
+    x = np.concatenate((low_idx, high_idx))
+    y = np.concatenate((lows, highs))
+    order = np.argsort(x, kind="stable")
+    return x[order], y[order]
+
+
+def _save_line(path, values, ylabel, title, max_points):
+    x, y = downsample(values, max_points)
+    fig = Figure()
+    ax = fig.subplots()
+    ax.plot(x, y)
+    ax.set_xlabel("Time")
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    fig.savefig(path)
+
+
+def plot_equity_curve(strategy_id, equity_curve, max_points=None):
+    Path(PLOTS_DIR).mkdir(parents=True, exist_ok=True)
+    _save_line(f"{PLOTS_DIR}/{strategy_id}_equity.png", equity_curve,
+               "Equity Value", f"Equity Curve — {strategy_id}", max_points)
 
-    for value in equity_curve:
-        if value > peak:
-            peak = value
-        drawdown = (value - peak) / peak
-        drawdowns.append(drawdown)
 
-    return drawdowns
+def plot_drawdown_curve(strategy_id, drawdowns, max_points=None):
+    Path(PLOTS_DIR).mkdir(parents=True, exist_ok=True)
+    _save_line(f"{PLOTS_DIR}/{strategy_id}_drawdown.png", drawdowns,
+               "Drawdown", f"Drawdown Curve — {strategy_id}", max_points)
 
 
-def plot_equity_curve(strategy_id, equity_curve):
-    Path("results/plots").mkdir(parents=True, exist_ok=True)
+def _render_from_store(args):
+    # runs in a pool worker: reads one curve straight from the Parquet store
+    from reporting.result_store import ResultStore
 
-    plt.figure()
-    plt.plot(equity_curve)
-    plt.xlabel("Time")
-    plt.ylabel("Equity Value")
-    plt.title(f"Equity Curve — {strategy_id}")
-    plt.savefig(f"results/plots/{strategy_id}_equity.png")
-    plt.close()
+    store_root, strategy_id, max_points = args
+    equity = ResultStore(store_root).equity_curve(strategy_id)
+    if not len(equity):
+        return None
+    plot_equity_curve(strategy_id, equity, max_points)
+    plot_drawdown_curve(strategy_id, compute_drawdown(equity), max_points)
+    return strategy_id
 
 
-def plot_drawdown_curve(strategy_id, drawdowns):
-    Path("results/plots").mkdir(parents=True, exist_ok=True)
+def render_plots(store, top_n=None, by="total_pnl", ascending=False, max_points=2000, workers=4):
+    """
+    Renders equity + drawdown PNGs for the store's strategies in a process pool.
+    top_n limits it to the best N by `by`; only strategy ids are sent to the
+    workers, each one loads its own curve from the store.
+    """
+    summary = store.summary(columns=["strategy_id", by] if by else ["strategy_id"])
+    if summary.empty:
+        return []
+    if top_n:
+        summary = summary.sort_values(by, ascending=ascending, kind="stable").head(top_n)
 
-    plt.figure()
-    plt.plot(drawdowns)
-    plt.xlabel("Time")
-    plt.ylabel("Drawdown")
-    plt.title(f"Drawdown Curve — {strategy_id}")
-    plt.savefig(f"results/plots/{strategy_id}_drawdown.png")
-    plt.close()
+    tasks = [(str(store.root), sid, max_points) for sid in summary["strategy_id"]]
+    if workers <= 1:
+        return [sid for sid in map(_render_from_store, tasks) if sid]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [sid for sid in pool.map(_render_from_store, tasks) if sid]
@@ -0,0 +1,117 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from Engine.metrics import decode_bars, decode_curve
+
+STORE_DIR = "results/store"
+
+# result keys that are not summary columns
+NON_SCALAR_KEYS = ("equity_curve", "parameters", "timings")
+
+
+class ResultStore:
+    """
+    Columnar experiment results:
+      <root>/summary/part-*.parquet  one row per strategy (metrics + flattened parameters)
+      <root>/equity/part-*.parquet   long table (strategy_id, bar, equity)
+    Results are buffered and written in bulk, one Parquet part per `batch_size`
+    results, instead of a JSON file per run and a CSV reopen per row.
+    """
+    def __init__(self, root=STORE_DIR, batch_size=64):
+        self.root = Path(root)
+        self.batch_size = batch_size
+        self._rows = []
+        self._curves = []
+        self._part = len(list((self.root / "summary").glob("part-*.parquet")))
+
+    def reset(self):
+        # a new sweep replaces the previous one
+        for name in ("summary", "equity", "enriched.parquet"):
+            path = self.root / name
+            if path.is_dir():
+                shutil.rmtree(path)
+            elif path.exists():
+                path.unlink()
+        self._part = 0
+        return self
+
+    # writing
+
+    def add(self, result):
+        row = {"strategy_id": result["strategy_id"]}
+        row.update(result.get("parameters", {}))
+        for key, value in result.items():
+            if key not in NON_SCALAR_KEYS and not isinstance(value, (dict, list)):
+                row[key] = value
+        self._rows.append(row)
+
+        payload = result.get("equity_curve")
+        curve = decode_curve(payload)
+        if len(curve):
+            self._curves.append((result["strategy_id"], decode_bars(payload), curve))
+
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        name = f"part-{self._part:05d}.parquet"
+
+        summary_dir = self.root / "summary"
+        summary_dir.mkdir(parents=True, exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(pd.DataFrame(self._rows), preserve_index=False),
+                       summary_dir / name, compression="snappy")
+
+        if self._curves:
+            equity_dir = self.root / "equity"
+            equity_dir.mkdir(parents=True, exist_ok=True)
+            lengths = [len(curve) for _, _, curve in self._curves]
+            table = pa.table({
+                "strategy_id": pa.array(np.repeat([sid for sid, _, _ in self._curves], lengths)).dictionary_encode(),
+                "bar": np.concatenate([bars for _, bars, _ in self._curves]).astype(np.int32),
+                "equity": np.concatenate([curve for _, _, curve in self._curves]),
+            })
+            pq.write_table(table, equity_dir / name, compression="snappy")
+
+        self._rows = []
+        self._curves = []
+        self._part += 1
+
+    def close(self):
+        self.flush()
+
+    # query API
+
+    def summary(self, columns=None):
+        path = self.root / "summary"
+        if not path.exists():
+            return pd.DataFrame()
+        return ds.dataset(path, format="parquet").to_table(columns=columns).to_pandas()
+
+    def top(self, n=10, by="total_pnl", ascending=False):
+        return self.summary().sort_values(by, ascending=ascending, kind="stable").head(n).reset_index(drop=True)
+
+    def where(self, expr):
+        # pandas query string, e.g. store.where("total_trades > 50 and max_drawdown > -20000")
+        return self.summary().query(expr).reset_index(drop=True)
+
+    def equity_curve(self, strategy_id):
+        path = self.root / "equity"
+        if not path.exists():
+            return np.array([])
+        table = ds.dataset(path, format="parquet").to_table(
+            columns=["bar", "equity"], filter=ds.field("strategy_id") == strategy_id
+        )
+        return table.sort_by("bar").column("equity").to_numpy()
+
+    def export_csv(self, path, frame=None):
+        frame = self.summary() if frame is None else frame
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        frame.to_csv(path, index=False)
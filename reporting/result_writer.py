@@ -2,8 +2,11 @@ import json
 import csv
 from pathlib import Path
 
+from Engine.metrics import decode_curve
+
 def save_run_result(result):
     Path("results/runs").mkdir(parents=True, exist_ok=True)
+    result = dict(result, equity_curve=decode_curve(result.get("equity_curve")).tolist())
     with open(f"results/runs/{result['strategy_id']}.json", "w") as f:
         json.dump(result, f, indent=4)
 
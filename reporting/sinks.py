@@ -0,0 +1,77 @@
+from Engine.metrics import decode_curve
+from reporting.result_writer import save_run_result, append_summary
+
+# A sink receives each result as soon as its job finishes (see Runner.batch_runner.run_streaming),
+# so writing/plotting overlaps with the backtests still running and nothing has to
+# hold every result until the end of the sweep.
+
+
+class ResultSink:
+    def handle(self, result):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CollectSink(ResultSink):
+    """Keeps every result in memory."""
+    def __init__(self):
+        self.results = []
+
+    def handle(self, result):
+        self.results.append(result)
+
+
+class WriterSink(ResultSink):
+    """Per-run JSON + summary CSV row."""
+    def handle(self, result):
+        save_run_result(result)
+        append_summary(result)
+
+
+class StoreSink(ResultSink):
+    """Buffers results into the columnar ResultStore, written in bulk Parquet parts."""
+    def __init__(self, store):
+        self.store = store
+
+    def handle(self, result):
+        self.store.add(result)
+
+    def close(self):
+        self.store.close()
+
+
+class PlotSink(ResultSink):
+    """Equity and drawdown PNGs for every result."""
+    def handle(self, result):
+        # imported lazily so runs without plots never load matplotlib
+        from reporting.plots import compute_drawdown, plot_equity_curve, plot_drawdown_curve
+
+        equity = decode_curve(result["equity_curve"])
+        drawdowns = compute_drawdown(equity)
+        plot_equity_curve(result["strategy_id"], equity)
+        plot_drawdown_curve(result["strategy_id"], drawdowns)
+
+
+class CountSink(ResultSink):
+    """Only counts results, for benchmarks that don't need the outputs."""
+    def __init__(self):
+        self.count = 0
+
+    def handle(self, result):
+        self.count += 1
+
+
+class MultiSink(ResultSink):
+    """Fans every result out to several sinks."""
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def handle(self, result):
+        for sink in self.sinks:
+            sink.handle(result)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
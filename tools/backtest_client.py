@@ -0,0 +1,104 @@
+import argparse
+import json
+import socket
+import sys
+import time
+
+# Plain client for the resident service (python -m Runner.service). Standard library only,
+# so it starts in milliseconds; the daemon holds pandas, the pool and the data.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def request(message, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Sends one request, yields the response lines as dicts until the request is answered:
+    "done", or an error without a job_id (the request failed as a whole).
+    """
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall((json.dumps(message) + "\n").encode())
+        stream = sock.makefile("r")
+        for line in stream:
+            reply = json.loads(line)
+            yield reply
+            if message["op"] != "sweep" or reply["type"] == "done" or is_request_error(reply):
+                return
+        raise ConnectionError("service closed the connection before answering")
+
+
+def is_request_error(reply):
+    return reply["type"] == "error" and "job_id" not in reply
+
+
+def parse_override(text):
+    # "execution.commission=0.0005" -> {"execution": {"commission": 0.0005}}
+    key, _, raw = text.partition("=")
+    try:
+        value = json.loads(raw)
+    except json.JSONDecodeError:
+        value = raw
+    override = value
+    for part in reversed(key.split(".")):
+        override = {part: override}
+    return override
+
+
+def merge(target, override):
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge(target[key], value)
+        else:
+            target[key] = value
+    return target
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Talk to the resident backtest service")
+    parser.add_argument("op", choices=["ping", "status", "sweep", "shutdown"])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="config override, e.g. --set strategies.ma_crossover.short_window=[10,20]")
+    parser.add_argument("--params", help="JSON list of param dicts to run instead of the config grid")
+    parser.add_argument("--equity", action="store_true", help="include the equity curves")
+    parser.add_argument("--output", help="write every result as a JSON line to this file")
+    parser.add_argument("--top", type=int, default=5, help="print the best N by --by")
+    parser.add_argument("--by", default="total_pnl")
+    args = parser.parse_args()
+
+    message = {"op": args.op}
+    if args.op == "sweep":
+        overrides = {}
+        for text in args.set:
+            merge(overrides, parse_override(text))
+        message.update({"config": overrides, "equity": args.equity})
+        if args.params:
+            message["params"] = json.loads(args.params)
+
+    start = time.perf_counter()
+    results = []
+    failed = False
+    out = open(args.output, "w") if args.output else None
+    try:
+        for reply in request(message, args.host, args.port):
+            if reply["type"] == "result":
+                results.append(reply)
+                if out:
+                    out.write(json.dumps(reply) + "\n")
+            elif reply["type"] == "error":
+                print("error:", reply.get("strategy_id", ""), reply["error"].strip().splitlines()[-1], file=sys.stderr)
+                failed = failed or is_request_error(reply)
+            elif reply["type"] == "done":
+                print(f"{reply['jobs']} jobs ({reply['cached']} cached, {reply['failed']} failed) "
+                      f"in {reply['seconds']}s on the service, {time.perf_counter() - start:.3f}s round trip")
+            else:
+                print(json.dumps(reply))
+    finally:
+        if out:
+            out.close()
+
+    for result in sorted(results, key=lambda r: r.get(args.by, 0), reverse=True)[:args.top]:
+        print(f"  {result['strategy_id']:<32} {args.by}={result.get(args.by)}")
+    if failed:
+        sys.exit(1)
@@ -32,7 +32,7 @@ def run():
     main()
 
     print("\nReport generation complete.")
-    print("Check the 'results/' folder for JSON, CSV, and plots.")
+    print("Check the 'results/' folder for the Parquet store, summary CSV, and plots.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Make sure project root is importable
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+import numpy as np
+
+from Engine.backtesting_engine import BacktestingEngine
+from Engine.data_loader import load_config_data
+from Engine.datafeed import ArrayDataFeed, to_columns
+from Engine.execution import ExecutionEngine
+from Engine.metrics import Metrics
+from Engine.portfolio import Portfolio
+from Engine.stop_rules import StopRules
+from Engine.vectorized_engine import VectorizedBacktestingEngine
+from Runner.config_loader import load_config
+from Runner.strategy_factory import generate_strategies
+from Strategies.ma_crossover import MACrossoverStrategy
+
+
+def run_backend(backend, columns, config, short, long):
+    ema_period = config["strategies"]["ma_crossover"].get("ema_period", 200)
+    strategy = MACrossoverStrategy(short, long, ema_period=ema_period)
+    execution = ExecutionEngine(config["execution"]["commission"], config["execution"]["slippage"])
+    metrics = Metrics(config["portfolio"]["capital"])
+    portfolio = Portfolio(config["portfolio"]["capital"], metrics)
+    stop = StopRules.from_dict(config.get("stop_rules"))
+
+    if backend == "vectorized":
+        engine = VectorizedBacktestingEngine(columns, execution, strategy, portfolio, metrics, stop=stop)
+    else:
+        engine = BacktestingEngine(ArrayDataFeed(columns), execution, strategy, portfolio, metrics, stop=stop)
+
+    start = time.time()
+    engine.run()
+    return portfolio, metrics, time.time() - start
+
+
+def verify(config, limit=None):
+    columns = to_columns(load_config_data(config))
+    params = generate_strategies(config)[:limit]
+    mismatches = 0
+    event_time = vector_time = 0.0
+
+    for short, long in params:
+        p_event, m_event, t_event = run_backend("event", columns, config, short, long)
+        p_vec, m_vec, t_vec = run_backend("vectorized", columns, config, short, long)
+        event_time += t_event
+        vector_time += t_vec
+
+        same = (
+            p_event.trades == p_vec.trades
+            and p_event.cash == p_vec.cash
+            and np.array_equal(m_event.equity_curve, m_vec.equity_curve)
+            and m_event.risk_summary() == m_vec.risk_summary()
+            and (m_event.termination_reason, m_event.terminated_bar) == (m_vec.termination_reason, m_vec.terminated_bar)
+            and p_event.position == p_vec.position
+        )
+        if not same:
+            mismatches += 1
+            print(f"MISMATCH ma_{short}_{long}: "
+                  f"{len(p_event.trades)} vs {len(p_vec.trades)} trades, "
+                  f"cash {p_event.cash} vs {p_vec.cash}")
+
+    print(f"Checked {len(params)} strategies, {mismatches} mismatches")
+    print(f"Event-driven: {event_time:.2f}s  Vectorized: {vector_time:.2f}s")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the vectorized backend against the event-driven engine")
+    parser.add_argument("--config", default="config/experiment.yaml")
+    parser.add_argument("--data", help="override data.path from the config")
+    parser.add_argument("--limit", type=int, help="only check the first N parameter combos")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.data:
+        config["data"]["path"] = args.data
+    sys.exit(0 if verify(config, args.limit) else 1)